@@ -0,0 +1,314 @@
+"""End-to-end benchmark of the supervisor against local fake components.
+
+The real application from `main:app` is driven in-process through an ASGI
+transport. The fake scraper, linker and summarizer run as HTTP servers in a
+child process on free local ports, Postgres and Redis are replaced by the
+in-memory stand-ins. Nothing leaves the machine.
+
+Run from the repository root:
+
+    python bench/e2e.py --sources 100,1000 --categories 5,20 --pool-sizes 1,4
+
+Every combination of source count, category count and
+`category_async_pool_size` is measured for `/api/fetch` and `/summarize`.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+from uuid import uuid4
+
+import httpx
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+import fakes  # noqa: E402
+import stand_ins  # noqa: E402
+from shared.routes import SupervisorRoutes  # noqa: E402
+
+HOST = "127.0.0.1"
+CONFIG_ID = 1
+COMPONENTS = ("scraper", "linker", "summarizer")
+RESULT_REPOSITORIES = (
+    "request_repo",
+    "story_repo",
+    "ss_repo",
+    "ss_view",
+    "summary_repo",
+)
+
+
+def parse_ints(value: str) -> list[int]:
+    return [int(x) for x in value.split(",")]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def configure_network(ports: dict[str, int]) -> None:
+    # NOTE: Environment variables take precedence over network.cfg
+    for component, port in ports.items():
+        os.environ[f"{component}_host"] = HOST
+        os.environ[f"{component}_port"] = str(port)
+
+
+async def wait_for_fakes(client: httpx.AsyncClient, ports: dict[str, int]):
+    for port in ports.values():
+        for _ in range(100):
+            try:
+                await client.get(f"http://{HOST}:{port}{fakes.SETTINGS_ROUTE}")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+        else:
+            raise RuntimeError(f"Fake component on port {port} didn't start")
+
+
+async def configure_fakes(
+    client: httpx.AsyncClient,
+    ports: dict[str, int],
+    settings: fakes.FakeSettings,
+) -> None:
+    for port in ports.values():
+        response = await client.put(
+            f"http://{HOST}:{port}{fakes.SETTINGS_ROUTE}",
+            json=settings.model_dump(),
+        )
+        response.raise_for_status()
+
+
+def summarize_latencies(
+    name: str,
+    latencies: list[float],
+    errors: int,
+    elapsed: float,
+    **params,
+) -> dict:
+    result = {
+        "endpoint": name,
+        **params,
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+    }
+    for q in (50, 95, 99):
+        result[f"p{q}_ms"] = (
+            round(float(np.percentile(latencies, q)) * 1000, 1)
+            if latencies
+            else None
+        )
+    return result
+
+
+async def load(call, requests: int, concurrency: int):
+    """Run `call(i)` `requests` times with at most `concurrency` at once."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await call(i)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def bench_fetch(client, ctx, args, **params) -> dict:
+    async def call(i: int):
+        preset = stand_ins.BenchPreset()
+        await ctx.preset_repo.add(preset)
+        return await client.post(
+            SupervisorRoutes.FETCH,
+            json={
+                "chat_id": i,
+                "preset_id": str(preset.preset_id),
+                "config_id": CONFIG_ID,
+                "end_date": "21/10/23 00:00:00",
+                "offset_date": "26/10/23 00:00:00",
+            },
+        )
+
+    latencies, errors, elapsed = await load(
+        call, args.requests, args.concurrency
+    )
+    return summarize_latencies("fetch", latencies, errors, elapsed, **params)
+
+
+async def bench_summarize(client, ctx, args, **params) -> dict:
+    from shared.models import Density
+
+    densities = [
+        density.value
+        for density in Density
+        if density not in (Density.TITLE, Density.CATEGORY)
+    ]
+    preset = stand_ins.BenchPreset()
+    await ctx.preset_repo.add(preset)
+
+    async def call(i: int):
+        story_id = uuid4()
+        await ctx.ss_view.add(
+            [
+                stand_ins.BenchStorySource(
+                    story_id=story_id,
+                    request_id=uuid4(),
+                    text=f"{story_id} source {j}",
+                    reference=f"https://t.me/c/0/{j}",
+                )
+                for j in range(args.story_size)
+            ]
+        )
+        return await client.post(
+            SupervisorRoutes.SUMMARIZE,
+            json={
+                "chat_id": i,
+                "story_id": str(story_id),
+                "config_id": CONFIG_ID,
+                "preset_id": str(preset.preset_id),
+                "required_density": densities,
+            },
+        )
+
+    latencies, errors, elapsed = await load(
+        call, args.requests, args.concurrency
+    )
+    return summarize_latencies(
+        "summarize", latencies, errors, elapsed, **params
+    )
+
+
+async def run(args, ports: dict[str, int]) -> list[dict]:
+    from cache import EntityCache
+    from context import ctx
+    from main import app
+
+    stand_ins.install(ctx)
+    fake_settings = fakes.FakeSettings(
+        sync_latency=fakes.Latency(median=args.scraper_latency),
+        parse_latency=fakes.Latency(median=args.scraper_latency),
+        linker_latency=fakes.Latency(median=args.linker_latency),
+        summarizer_latency=fakes.Latency(
+            median=args.summarizer_latency, sigma=0.6
+        ),
+        embedding_dim=args.embedding_dim,
+    )
+    await ctx.config_repo.add(
+        stand_ins.BenchConfig(
+            config_id=CONFIG_ID,
+            categorize_method=fake_settings.categorize_method,
+        )
+    )
+
+    results = []
+    async with (
+        app.router.lifespan_context(app),
+        httpx.AsyncClient() as control,
+        httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://supervisor",
+            timeout=None,
+        ) as client,
+    ):
+        logging.getLogger("supervisor").setLevel(args.log_level)
+        await wait_for_fakes(control, ports)
+        ctx.entity_cache.drop(EntityCache.CONFIG)
+
+        for sources, categories, pool_size in itertools.product(
+            args.sources, args.categories, args.pool_sizes
+        ):
+            fake_settings.sources = sources
+            fake_settings.categories = categories
+            await configure_fakes(control, ports, fake_settings)
+            ctx.shared_settings.config.category_async_pool_size = pool_size
+            params = {
+                "sources": sources,
+                "categories": categories,
+                "pool_size": pool_size,
+            }
+            for bench in (bench_fetch, bench_summarize):
+                result = await bench(client, ctx, args, **params)
+                results.append(result)
+                print(format_row(result), flush=True)
+            for repo in RESULT_REPOSITORIES:
+                getattr(ctx, repo).clear()
+    return results
+
+
+COLUMNS = (
+    "endpoint",
+    "sources",
+    "categories",
+    "pool_size",
+    "requests",
+    "errors",
+    "throughput_rps",
+    "p50_ms",
+    "p95_ms",
+    "p99_ms",
+)
+
+
+def format_row(row: dict) -> str:
+    return "".join(f"{str(row[column]):>15}" for column in COLUMNS)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sources", type=parse_ints, default=[100, 1000])
+    parser.add_argument("--categories", type=parse_ints, default=[5, 20])
+    parser.add_argument("--pool-sizes", type=parse_ints, default=[1, 4])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--story-size", type=int, default=5)
+    parser.add_argument("--embedding-dim", type=int, default=384)
+    parser.add_argument("--scraper-latency", type=float, default=0.05)
+    parser.add_argument("--linker-latency", type=float, default=0.02)
+    parser.add_argument("--summarizer-latency", type=float, default=0.5)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    ports = {component: free_port() for component in COMPONENTS}
+    configure_network(ports)
+    servers = multiprocessing.Process(
+        target=fakes.run, args=(HOST, ports), daemon=True
+    )
+    servers.start()
+    try:
+        print("".join(f"{column:>15}" for column in COLUMNS), flush=True)
+        results = asyncio.run(run(args, ports))
+    finally:
+        servers.terminate()
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
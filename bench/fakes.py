@@ -0,0 +1,193 @@
+"""Local stand-ins for the scraper, linker and summarizer components.
+
+Every fake is a small FastAPI app serving the same routes as the real
+component. Latency, payload sizes and the shape of linking results are set
+through `PUT /bench/settings`, so one set of servers can be reused for the
+whole benchmark matrix.
+"""
+
+import asyncio
+import random
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request, Response, status
+from pydantic import BaseModel
+from synthetic import make_sources, make_text, split
+
+from shared.routes import LinkerRoutes, ScraperRoutes, SummarizerRoutes
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+SETTINGS_ROUTE = "/bench/settings"
+MSGPACK_CONTENT_TYPE = "application/x-msgpack"
+NDARRAY_EXT_CODE = 1
+
+
+class Latency(BaseModel):
+    """Log-normal latency with the given median and spread in seconds."""
+
+    median: float = 0.01
+    sigma: float = 0.3
+
+    async def sleep(self) -> None:
+        if self.median > 0:
+            await asyncio.sleep(
+                random.lognormvariate(0, self.sigma) * self.median
+            )
+
+
+class FakeSettings(BaseModel):
+    sync_latency: Latency = Latency()
+    parse_latency: Latency = Latency(median=0.05)
+    linker_latency: Latency = Latency(median=0.02)
+    summarizer_latency: Latency = Latency(median=0.5, sigma=0.6)
+    sources: int = 500
+    channels: int = 20
+    text_length: int = 400
+    embedding_dim: int = 384
+    categories: int = 10
+    stories_per_category: int = 5
+    categorize_method: str = "kmeans"
+    summary_length: int = 600
+
+
+def _ext_hook(code: int, data: bytes):
+    if code == NDARRAY_EXT_CODE:
+        dtype, shape, buffer = msgpack.unpackb(data)
+        return np.frombuffer(buffer, dtype=dtype).reshape(shape)
+    return msgpack.ExtType(code, data)
+
+
+def _settings_routes(app: FastAPI) -> None:
+    @app.get(SETTINGS_ROUTE)
+    async def get_settings():
+        return app.state.settings
+
+    @app.put(SETTINGS_ROUTE)
+    async def put_settings(settings: FakeSettings):
+        app.state.settings = settings
+        return settings
+
+
+def create_scraper() -> FastAPI:
+    app = FastAPI()
+    app.state.settings = FakeSettings()
+    _settings_routes(app)
+
+    @app.get(ScraperRoutes.SYNC)
+    async def sync(link: str):
+        settings: FakeSettings = app.state.settings
+        await settings.sync_latency.sleep()
+        return [
+            {"channel_id": i, "link": f"{link}/{i}"}
+            for i in range(settings.channels)
+        ]
+
+    @app.post(ScraperRoutes.PARSE)
+    async def parse(request: Request):
+        settings: FakeSettings = app.state.settings
+        body = await request.json()
+        await settings.parse_latency.sleep()
+
+        embedders = body.get("required_embedders") or ["mini-lm-embedder"]
+        # NOTE: Texts are random per request so that requests don't get
+        # coalesced with each other by the supervisor
+        sources = make_sources(
+            settings.sources,
+            embedders,
+            settings.embedding_dim,
+            channels=settings.channels,
+            text_length=settings.text_length,
+        )
+        return {"sources": sources, "skipped_channel_ids": []}
+
+    return app
+
+
+def create_linker() -> FastAPI:
+    app = FastAPI()
+    app.state.settings = FakeSettings()
+    _settings_routes(app)
+
+    @app.post(LinkerRoutes.GET_STORIES)
+    async def get_stories(request: Request):
+        settings: FakeSettings = app.state.settings
+        content_type = request.headers.get("Content-Type", "")
+        if content_type.startswith(MSGPACK_CONTENT_TYPE):
+            if msgpack is None:
+                return Response(
+                    status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+                )
+            content = await request.body()
+            if request.headers.get("Content-Encoding") == "zstd":
+                if zstandard is None:
+                    return Response(
+                        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+                    )
+                content = zstandard.ZstdDecompressor().decompress(content)
+            body = msgpack.unpackb(content, ext_hook=_ext_hook)
+        else:
+            body = await request.json()
+        await settings.linker_latency.sleep()
+
+        if body["config"]["method"] == settings.categorize_method:
+            groups = settings.categories
+        else:
+            # NOTE: The last story of a category is treated as noise
+            groups = settings.stories_per_category + 1
+        stories_nums = split(len(body["entries"]), groups, random.Random())
+        return {"results": [{"stories_nums": stories_nums}]}
+
+    return app
+
+
+def create_summarizer() -> FastAPI:
+    app = FastAPI()
+    app.state.settings = FakeSettings()
+    _settings_routes(app)
+
+    @app.post(SummarizerRoutes.SUMMARIZE)
+    async def summarize(request: Request):
+        settings: FakeSettings = app.state.settings
+        body = await request.json()
+        await settings.summarizer_latency.sleep()
+        summary = make_text(settings.summary_length, random.Random())
+        return {
+            "original": summary,
+            "edited": summary,
+            "density": body["density"],
+        }
+
+    return app
+
+
+FAKES = {
+    "scraper": create_scraper,
+    "linker": create_linker,
+    "summarizer": create_summarizer,
+}
+
+
+async def serve(host: str, ports: dict[str, int]) -> None:
+    servers = [
+        uvicorn.Server(
+            uvicorn.Config(
+                FAKES[name](), host=host, port=port, log_level="warning"
+            )
+        )
+        for name, port in ports.items()
+    ]
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+def run(host: str, ports: dict[str, int]) -> None:
+    asyncio.run(serve(host, ports))
@@ -0,0 +1,245 @@
+"""Microbenchmarks of CPU-bound code running on the supervisor event loop.
+
+Every benchmark runs on synthetic batches of sources of each requested
+size. The reported time is the median and minimum of `--repeat` runs, peak
+memory is measured with tracemalloc in a separate run.
+
+Run from the repository root:
+
+    python bench/micro.py --sizes 100,1000,10000,100000 --save baseline.json
+    python bench/micro.py --compare baseline.json
+
+With `--compare`, the exit code is 1 if any median time grew by more than
+`--threshold` compared to the baseline.
+"""
+
+import argparse
+import gc
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+from uuid import uuid4
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from models import PartialFetchResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from ranking import (  # noqa: E402
+    Ranker,
+    VectorRanker,
+    count_reactions,
+    init_scorers,
+)
+from synthetic import make_sources, split  # noqa: E402
+from utils import form_scraper_request, link_entity  # noqa: E402
+
+from shared.entities import Source  # noqa: E402
+from shared.models import (  # noqa: E402
+    EmbeddingSource,
+    FetchRequest,
+    ParseResponse,
+)
+
+EMBEDDERS = ["mini-lm-embedder"]
+SOURCES_PER_STORY = 20
+STORIES_PER_CATEGORY = 10
+
+
+class Batch:
+    """Inputs of every benchmark derived from one batch of sources."""
+
+    def __init__(self, size: int, embedding_dim: int, seed: int):
+        rng = random.Random(seed)
+        self.payload = {
+            "sources": make_sources(size, EMBEDDERS, embedding_dim, seed=seed),
+            "skipped_channel_ids": [],
+        }
+        self.sources = TypeAdapter(list[Source]).validate_python(
+            self.payload["sources"]
+        )
+        self.stories_nums = split(size, max(size // SOURCES_PER_STORY, 1), rng)
+        self.stories = list(
+            zip(
+                [uuid4() for _ in self.stories_nums],
+                link_entity(self.stories_nums, self.sources),
+            )
+        )
+        self.channels = [
+            {"channel_id": i, "link": f"https://t.me/c/{i}"}
+            for i in range(max(size // 100, 1))
+        ]
+        self.request = TypeAdapter(FetchRequest).validate_python(
+            {
+                "chat_id": 0,
+                "preset_id": str(uuid4()),
+                "config_id": 0,
+                "end_date": "21/10/23 00:00:00",
+                "offset_date": "26/10/23 00:00:00",
+            }
+        )
+        self.response = {
+            "config_id": 0,
+            "categories": [
+                {
+                    "uuid": uuid4(),
+                    "stories": [
+                        {"uuid": uuid4(), "noise": i % 5 == 4}
+                        for i in range(STORIES_PER_CATEGORY)
+                    ],
+                }
+                for _ in range(
+                    max(len(self.stories_nums) // STORIES_PER_CATEGORY, 1)
+                )
+            ],
+            "skipped_channel_ids": [],
+            "skipped_category_ids": [],
+        }
+
+
+def _ranking(ranker: Ranker) -> Callable[[Batch], Callable[[], Any]]:
+    scorers = ranker.scorers
+    weights = {scorer.get_label(): 1.0 for scorer in scorers}
+
+    def prepare(batch: Batch):
+        def run():
+            # NOTE: Reactions of fresh sources are never cached in production
+            count_reactions.cache_clear()
+            return ranker.get_sorted(batch.stories, weights=weights)
+
+        return run
+
+    return prepare
+
+
+def _link_entity(batch: Batch):
+    return lambda: link_entity(batch.stories_nums, batch.sources)
+
+
+def _form_scraper_request(batch: Batch):
+    return lambda: form_scraper_request(
+        batch.request, EmbeddingSource.MLM, batch.channels
+    )
+
+
+def _validate_parse_response(batch: Batch):
+    adapter = TypeAdapter(ParseResponse)
+    return lambda: adapter.validate_python(batch.payload)
+
+
+def _validate_fetch_response(batch: Batch):
+    adapter = TypeAdapter(PartialFetchResponse)
+    return lambda: adapter.validate_python(batch.response)
+
+
+BENCHMARKS: dict[str, Callable[[Batch], Callable[[], Any]]] = {
+    "ranker.get_sorted": _ranking(Ranker(init_scorers())),
+    "vector_ranker.get_sorted": _ranking(VectorRanker(init_scorers())),
+    "link_entity": _link_entity,
+    "form_scraper_request": _form_scraper_request,
+    "validate_parse_response": _validate_parse_response,
+    "validate_fetch_response": _validate_fetch_response,
+}
+
+
+def measure(run: Callable[[], Any], repeat: int) -> dict[str, float]:
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "median_ms": round(statistics.median(times) * 1000, 3),
+        "min_ms": round(min(times) * 1000, 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def compare(
+    results: list[dict], baseline: list[dict], threshold: float
+) -> bool:
+    previous = {(row["benchmark"], row["sources"]): row for row in baseline}
+    regressed = False
+    for row in results:
+        base = previous.get((row["benchmark"], row["sources"]))
+        if base is None:
+            continue
+        ratio = row["median_ms"] / max(base["median_ms"], 1e-6)
+        mark = ""
+        if ratio > 1 + threshold:
+            mark = "  REGRESSION"
+            regressed = True
+        print(
+            f"{row['benchmark']:>28} {row['sources']:>8} "
+            f"{base['median_ms']:>12} -> {row['median_ms']:>12} ms "
+            f"x{ratio:.2f}{mark}"
+        )
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=lambda x: [int(s) for s in x.split(",")],
+        default=[100, 1000, 10000, 100000],
+    )
+    parser.add_argument(
+        "--embedding-dim",
+        type=int,
+        default=128,
+        help="validated embeddings of 100k sources take ~1 GiB at 384",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", choices=list(BENCHMARKS))
+    parser.add_argument("--save", type=Path)
+    parser.add_argument("--compare", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    results = []
+    print(
+        f"{'benchmark':>28} {'sources':>8} {'median_ms':>12} "
+        f"{'min_ms':>12} {'peak_kib':>12}"
+    )
+    for size in args.sizes:
+        batch = Batch(size, args.embedding_dim, args.seed)
+        for name, prepare in BENCHMARKS.items():
+            if args.only and name not in args.only:
+                continue
+            row = {
+                "benchmark": name,
+                "sources": size,
+                **measure(prepare(batch), args.repeat),
+            }
+            results.append(row)
+            print(
+                f"{name:>28} {size:>8} {row['median_ms']:>12} "
+                f"{row['min_ms']:>12} {row['peak_kib']:>12}",
+                flush=True,
+            )
+        del batch
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2))
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""In-memory replacements of Postgres and Redis for the supervisor context.
+
+`install` swaps the database, every repository and the Redis client held by
+`ctx` and its members. Redis is replaced by `fakeredis` unless
+`BENCH_REDIS_URL` points to a local Redis server.
+"""
+
+import os
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from uuid import UUID, uuid4
+
+from coordination import NoCoordination
+from redis.asyncio import Redis
+from shared.db import PgRepository
+
+
+class InMemoryDatabase:
+    """Accepts every statement and keeps nothing."""
+
+    def __init__(self):
+        self.statements = 0
+
+    async def connect(self) -> None:
+        pass
+
+    async def disconnect(self) -> None:
+        pass
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    async def execute(self, query, values=None) -> None:
+        self.statements += 1
+
+
+class InMemoryRepository:
+    """Keeps rows in a list and filters them by a single field."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rows: list = []
+
+    async def get(self, field_name: str | None = None, value=None) -> list:
+        if field_name is None:
+            return list(self.rows)
+        return [
+            row
+            for row in self.rows
+            if str(getattr(row, field_name, None)) == str(value)
+        ]
+
+    async def add(self, entities) -> None:
+        if isinstance(entities, list):
+            self.rows.extend(entities)
+        else:
+            self.rows.append(entities)
+
+    async def update(self, entity, fields) -> None:
+        pass
+
+    def clear(self) -> None:
+        self.rows.clear()
+
+
+@dataclass
+class BenchConfig:
+    config_id: int
+    embedding_source: str = "mlm"
+    categorize_method: str = "kmeans"
+    linking_method: str = "hdbscan"
+    summary_method: str = "bart"
+    editor_model: str | None = None
+    inactive: bool = False
+
+
+@dataclass
+class BenchPreset:
+    preset_id: UUID = field(default_factory=uuid4)
+    chat_folder_link: str = "https://t.me/addlist/bench"
+    editor_prompt: str | None = None
+
+
+@dataclass
+class BenchStorySource:
+    story_id: UUID
+    request_id: UUID
+    text: str
+    reference: str
+    embeddings: dict = field(default_factory=dict)
+
+
+def create_redis() -> Redis:
+    url = os.getenv("BENCH_REDIS_URL")
+    if url:
+        return Redis.from_url(url)
+
+    try:
+        from fakeredis import FakeAsyncRedis
+    except ImportError as e:
+        raise RuntimeError(
+            "Install the bench extra or set BENCH_REDIS_URL to a local Redis"
+        ) from e
+    return FakeAsyncRedis()
+
+
+def install(ctx) -> None:
+    redis = create_redis()
+    ctx.pg = InMemoryDatabase()
+    for name, value in list(vars(ctx).items()):
+        if isinstance(value, PgRepository):
+            setattr(ctx, name, InMemoryRepository(name))
+
+    ctx.redis = redis
+    ctx.summary_cache.redis = redis
+    ctx.timelines.redis = redis
+    ctx.channel_sync.redis = redis
+    ctx.fetches.redis = redis
+    ctx.fetch_jobs.redis = redis
+    ctx.entity_cache.redis = redis
+    ctx.entity_cache.config_repo = ctx.config_repo
+    ctx.entity_cache.preset_repo = ctx.preset_repo
+    ctx.scheduler.redis = redis
+    ctx.scheduler.pg = ctx.pg
+    ctx.scheduler.schedule_view = ctx.schedule_view
+    ctx.scheduler.dispatcher.redis = redis
+    ctx.scheduler.coordinator = NoCoordination()
@@ -0,0 +1,86 @@
+"""Synthetic scraper payloads shared by the benchmarks."""
+
+import json
+import random
+import string
+from datetime import datetime, timedelta
+
+import numpy as np
+
+REACTIONS = ("👍", "🔥", "❤", "😁", "🤔", "👎", "😢", "🎉")
+
+
+def make_text(length: int, rng: random.Random) -> str:
+    words = []
+    size = 0
+    while size < length:
+        word = "".join(
+            rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))
+        )
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:length]
+
+
+def make_reactions(rng: random.Random) -> str:
+    return json.dumps(
+        [
+            {"reaction": reaction, "count": rng.randint(1, 5000)}
+            for reaction in rng.sample(REACTIONS, rng.randint(0, 5))
+        ]
+    )
+
+
+def make_sources(
+    size: int,
+    embedders: list[str],
+    embedding_dim: int,
+    channels: int = 20,
+    text_length: int = 400,
+    seed: int | str | None = None,
+) -> list[dict]:
+    """Scraper sources as they are sent over the wire.
+
+    Texts, reactions and comments are generated per source, embeddings are
+    drawn from a pool of 1024 vectors per embedder to bound generation time
+    and memory for large batches.
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(rng.getrandbits(32))
+    pool = {
+        embedder: np_rng.standard_normal(
+            (min(size, 1024), embedding_dim), dtype=np.float32
+        )
+        .round(5)
+        .tolist()
+        for embedder in embedders
+    }
+    now = datetime.now()
+    return [
+        {
+            "source_id": i,
+            "channel_id": i % channels,
+            "text": make_text(text_length, rng),
+            "date": (now - timedelta(minutes=i)).isoformat(),
+            "reference": f"https://t.me/c/{i % channels}/{i}",
+            "views": rng.randint(0, 100000),
+            "reactions": make_reactions(rng),
+            "comments": [
+                make_text(rng.randint(10, 80), rng)
+                for _ in range(rng.choice((0, 0, 1, 3, 10)))
+            ],
+            "embeddings": {
+                embedder: vectors[i % len(vectors)]
+                for embedder, vectors in pool.items()
+            },
+        }
+        for i in range(size)
+    ]
+
+
+def split(size: int, groups: int, rng: random.Random) -> list[list[int]]:
+    """Randomly partition `range(size)` into `groups` non-empty groups."""
+    indices = list(range(size))
+    rng.shuffle(indices)
+    groups = max(min(groups, size), 1)
+    return [indices[i::groups] for i in range(groups)]
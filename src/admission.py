@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from deadline import DeadlineExceeded
+from exceptions import OverloadException
+
+from config import AdmissionSettings
+
+logger = logging.getLogger("supervisor")
+
+
+class AdmissionLimiter:
+    """Limits concurrent requests to a component.
+
+    At most `max_concurrency` requests run at once and at most `max_queue`
+    wait for a slot. Requests arriving when the queue is full are rejected
+    right away instead of slowing down everyone else, requests still waiting
+    after `timeout` seconds fail with `DeadlineExceeded`.
+    """
+
+    def __init__(self, component: str, settings: AdmissionSettings):
+        self.component = component
+        self.settings = settings
+        self._semaphore = asyncio.Semaphore(settings.max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait_sec = 0.0
+        self.max_wait_sec = 0.0
+
+    @asynccontextmanager
+    async def slot(self, timeout: float | None = None):
+        queue_full = self.waiting >= self.settings.max_queue
+        if self._semaphore.locked() and queue_full:
+            self.rejected += 1
+            logger.warning(
+                f"Rejected request to {self.component}: "
+                f"{self.waiting} requests are already waiting"
+            )
+            raise OverloadException(self.component, self.settings.retry_after)
+
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            logger.warning(
+                f"Request deadline exceeded while waiting for {self.component}"
+            )
+            raise DeadlineExceeded() from None
+        finally:
+            self.waiting -= 1
+
+        wait_sec = time.monotonic() - start
+        self.admitted += 1
+        self.total_wait_sec += wait_sec
+        self.max_wait_sec = max(self.max_wait_sec, wait_sec)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def try_acquire(self) -> bool:
+        """Take a slot only if one is free right away, see `release`."""
+        if self._semaphore.locked():
+            return False
+        await self._semaphore.acquire()
+        self.admitted += 1
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_sec": self.total_wait_sec / max(self.admitted, 1),
+            "max_wait_sec": self.max_wait_sec,
+        }
@@ -0,0 +1,79 @@
+import importlib.util
+import logging
+
+import httpx
+from utils import REQUEST_TIMEOUT
+
+from config import ComponentPoolSettings, HttpSettings
+
+logger = logging.getLogger("supervisor")
+
+
+class ComponentClients:
+    """Long-lived HTTP clients, one connection pool per downstream component.
+
+    Clients are created in `open` and closed in `close`, both of which are
+    called from the application lifespan.
+    """
+
+    COMPONENTS = ("scraper", "linker", "summarizer")
+
+    def __init__(self, settings: HttpSettings):
+        self.settings = settings
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    @staticmethod
+    def _http2_available() -> bool:
+        return importlib.util.find_spec("h2") is not None
+
+    def _create_client(
+        self, component: str, settings: ComponentPoolSettings
+    ) -> httpx.AsyncClient:
+        http2 = settings.http2
+        if http2 and not self._http2_available():
+            logger.warning(
+                f"HTTP/2 is enabled for {component}, but h2 package is not "
+                "installed. Falling back to HTTP/1.1"
+            )
+            http2 = False
+
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_keepalive_connections,
+                keepalive_expiry=settings.keepalive_expiry,
+            ),
+            http2=http2,
+            timeout=REQUEST_TIMEOUT,
+        )
+
+    async def open(self) -> None:
+        for component in self.COMPONENTS:
+            self._clients[component] = self._create_client(
+                component, getattr(self.settings, component)
+            )
+        logger.info("Created HTTP client pools for downstream components")
+
+    async def close(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+        logger.info("Closed HTTP client pools for downstream components")
+
+    def _get(self, component: str) -> httpx.AsyncClient:
+        client = self._clients.get(component)
+        if client is None:
+            raise RuntimeError(f"HTTP client for {component} is not opened")
+        return client
+
+    @property
+    def scraper(self) -> httpx.AsyncClient:
+        return self._get("scraper")
+
+    @property
+    def linker(self) -> httpx.AsyncClient:
+        return self._get("linker")
+
+    @property
+    def summarizer(self) -> httpx.AsyncClient:
+        return self._get("summarizer")
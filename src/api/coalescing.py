@@ -0,0 +1,92 @@
+import asyncio
+import contextvars
+import logging
+from typing import Any, Awaitable, Callable, Hashable
+
+from deadline import (
+    DeadlineExceeded,
+    current_deadline,
+    extend_deadline,
+    remaining,
+)
+from timeline import TimelineGroup, current_timeline, share_timeline
+
+logger = logging.getLogger("supervisor")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with an identical key into one call.
+
+    The first caller starts the call in a separate task, later callers with
+    the same key await the same task. A caller being cancelled doesn't
+    cancel the shared call for the others, the call is cancelled once every
+    caller is gone.
+
+    Each caller waits for the call within its own deadline. The call itself
+    runs until the latest deadline among the callers and records its spans
+    to the timeline of every caller. The deadline is extended as callers
+    join, timeouts the call has already derived from it are kept.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        self._waiters: dict[asyncio.Task, int] = {}
+        self._scopes: dict[
+            asyncio.Task, tuple[contextvars.Context, TimelineGroup]
+        ] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(
+        self, key: Hashable, call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            self.executed += 1
+            context = contextvars.copy_context()
+            group = TimelineGroup()
+            group.join(current_timeline())
+            context.run(share_timeline, group)
+            task = asyncio.get_running_loop().create_task(
+                call(), context=context
+            )
+            self._calls[key] = task
+            self._scopes[task] = (context, group)
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            self.coalesced += 1
+            logger.debug(f"Joined in-flight {self.name} call")
+            context, group = self._scopes[task]
+            context.run(extend_deadline, current_deadline())
+            group.join(current_timeline())
+
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), remaining())
+        except TimeoutError:
+            if task.done():
+                raise
+            raise DeadlineExceeded()
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    logger.debug(f"Cancelling abandoned {self.name} call")
+                    task.cancel()
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        self._scopes.pop(task, None)
+        # NOTE: Mark the exception as retrieved in case every caller is gone
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "in_flight": len(self._calls),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,136 @@
+import logging
+from typing import Any
+
+import httpx
+import numpy as np
+from fastapi import status
+
+from config import BinaryTransportSettings
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger("supervisor")
+
+MSGPACK_CONTENT_TYPE = "application/x-msgpack"
+NDARRAY_EXT_CODE = 1
+# NOTE: 400 and 422 are left out, they are also returned for invalid
+# requests, which must not be re-sent or turn the binary transport off
+REJECTED_STATUSES = (
+    status.HTTP_406_NOT_ACCEPTABLE,
+    status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+)
+
+
+def _pack_ndarray(array: np.ndarray) -> Any:
+    array = np.ascontiguousarray(array)
+    return msgpack.ExtType(
+        NDARRAY_EXT_CODE,
+        msgpack.packb([array.dtype.str, array.shape, array.tobytes()]),
+    )
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        return _pack_ndarray(obj)
+    raise TypeError(f"Can't serialize object of type {type(obj).__name__}")
+
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    if code == NDARRAY_EXT_CODE:
+        dtype, shape, buffer = msgpack.unpackb(data)
+        return np.frombuffer(buffer, dtype=dtype).reshape(shape)
+    return msgpack.ExtType(code, data)
+
+
+def to_builtin(value: Any) -> Any:
+    """Replace arrays of a decoded payload with lists, e.g. for validation."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, dict):
+        return {k: to_builtin(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [to_builtin(v) for v in value]
+    return value
+
+
+def _to_arrays(value: Any, dtype: np.dtype) -> Any:
+    if isinstance(value, dict):
+        return {k: _to_arrays(v, dtype) for k, v in value.items()}
+    if isinstance(value, list) and value:
+        return np.asarray(value, dtype=dtype)
+    return value
+
+
+class BinaryCodec:
+    """Binary transport for embedding-heavy payloads.
+
+    Embeddings are sent as raw float buffers inside msgpack extension types,
+    optionally compressed with zstd. Arrays of binary responses are decoded
+    as read-only ndarrays. The codec is disabled for the rest of the process
+    lifetime once a component rejects the binary payload, and callers fall
+    back to JSON.
+    """
+
+    def __init__(self, settings: BinaryTransportSettings):
+        self.settings = settings
+        self.dtype = np.dtype(np.float16 if settings.float16 else np.float32)
+        self.enabled = settings.enabled and msgpack is not None
+        if settings.enabled and msgpack is None:
+            logger.warning(
+                "Binary transport is enabled, but msgpack package is not "
+                "installed. Falling back to JSON"
+            )
+        self.compress = settings.zstd and zstandard is not None
+        if settings.zstd and zstandard is None:
+            logger.warning(
+                "zstd compression is enabled, but zstandard package is not "
+                "installed. Sending uncompressed payloads"
+            )
+
+    def encode(
+        self, body: dict, embedding_fields: tuple[str, ...] = ("entries",)
+    ) -> tuple[bytes, dict[str, str]]:
+        body = dict(body)
+        for field in embedding_fields:
+            body[field] = [
+                {
+                    k: _to_arrays(v, self.dtype) if k == "embeddings" else v
+                    for k, v in entry.items()
+                }
+                for entry in body[field]
+            ]
+
+        content = msgpack.packb(body, default=_default)
+        headers = {
+            "Content-Type": MSGPACK_CONTENT_TYPE,
+            "Accept": f"{MSGPACK_CONTENT_TYPE}, application/json",
+        }
+        if self.compress:
+            content = zstandard.ZstdCompressor(
+                level=self.settings.zstd_level
+            ).compress(content)
+            headers["Content-Encoding"] = "zstd"
+        return content, headers
+
+    def disable(self, component: str) -> None:
+        if self.enabled:
+            logger.warning(
+                f"{component} does not accept binary payloads, "
+                "falling back to JSON"
+            )
+        self.enabled = False
+
+
+def decode_response(response: httpx.Response) -> Any:
+    content_type = response.headers.get("Content-Type", "")
+    if msgpack is not None and content_type.startswith(MSGPACK_CONTENT_TYPE):
+        return msgpack.unpackb(response.content, ext_hook=_ext_hook)
+    return response.json()
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Hashable
+
+import numpy as np
+
+from config import HedgingSettings
+
+logger = logging.getLogger("supervisor")
+
+Reserve = Callable[[], Awaitable[Callable[[], None] | None]]
+
+
+class HedgingPolicy:
+    """Sends a duplicate of a slow call and uses whichever answers first.
+
+    A call is hedged once it runs longer than the configured percentile of
+    recently observed latencies with the same key. Every call earns `budget`
+    hedge tokens and every hedge spends one, so hedging adds at most
+    `budget` extra load on average and `max_burst` hedges in a row. With
+    `reserve`, a hedge is sent only if it can take its own concurrency slot
+    right away; `reserve` returns a callback releasing the slot or `None`.
+    """
+
+    def __init__(self, name: str, settings: HedgingSettings):
+        self.name = name
+        self.settings = settings
+        self._latencies: dict[Hashable, deque[float]] = {}
+        self._tokens = 0.0
+        self.calls = 0
+        self.fired = 0
+        self.won = 0
+        self.over_budget = 0
+        self.no_slot = 0
+
+    def delay(self, key: Hashable) -> float | None:
+        latencies = self._latencies.get(key)
+        if (
+            not self.settings.enabled
+            or latencies is None
+            or len(latencies) < self.settings.min_samples
+        ):
+            return None
+        return max(
+            float(np.percentile(latencies, self.settings.percentile)),
+            self.settings.min_delay,
+        )
+
+    def _record(self, key: Hashable, latency: float) -> None:
+        if key not in self._latencies:
+            self._latencies[key] = deque(maxlen=self.settings.window)
+        self._latencies[key].append(latency)
+
+    async def do(
+        self,
+        key: Hashable,
+        call: Callable[[], Awaitable[Any]],
+        reserve: Reserve | None = None,
+    ) -> Any:
+        self.calls += 1
+        self._tokens = min(
+            self._tokens + self.settings.budget, self.settings.max_burst
+        )
+        delay = self.delay(key)
+        tasks = [asyncio.ensure_future(call())]
+        # NOTE: Latency of the winner is measured from its own start, the
+        # hedge delay must not leak into the percentile
+        starts = {tasks[0]: time.monotonic()}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                if self._tokens < 1:
+                    self.over_budget += 1
+                else:
+                    await self._hedge(tasks, starts, call, reserve, delay)
+            winner = await self._first_succeeded(tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if winner is not tasks[0]:
+            self.won += 1
+        result = winner.result()
+        self._record(key, time.monotonic() - starts[winner])
+        return result
+
+    async def _hedge(
+        self,
+        tasks: list[asyncio.Task],
+        starts: dict[asyncio.Task, float],
+        call: Callable[[], Awaitable[Any]],
+        reserve: Reserve | None,
+        delay: float,
+    ) -> None:
+        release = None
+        if reserve is not None:
+            release = await reserve()
+            if release is None:
+                self.no_slot += 1
+                return
+
+        self._tokens -= 1
+        self.fired += 1
+        logger.debug(f"Hedging {self.name} call after {delay:.3f} seconds")
+        hedge = asyncio.ensure_future(call())
+        starts[hedge] = time.monotonic()
+        if release is not None:
+            hedge.add_done_callback(lambda _: release())
+        tasks.append(hedge)
+
+    async def _first_succeeded(
+        self, tasks: list[asyncio.Task]
+    ) -> asyncio.Task:
+        pending = set(tasks)
+        while True:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in tasks:
+                if task in done and task.exception() is None:
+                    return task
+            if not pending:
+                # NOTE: Every call failed, let the caller see the first error
+                return tasks[0]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "fired": self.fired,
+            "won": self.won,
+            "over_budget": self.over_budget,
+            "no_slot": self.no_slot,
+            "delays": {str(key): self.delay(key) for key in self._latencies},
+        }
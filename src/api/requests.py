@@ -1,13 +1,30 @@
+import asyncio
+import functools
 import logging
 import traceback
+from typing import Callable
 from uuid import UUID
 
 import httpx
-from context import ctx, linking_settings, network_settings
+from api.codec import REJECTED_STATUSES, decode_response
+from context import (
+    ctx,
+    linking_settings,
+    network_settings,
+    supervisor_settings,
+)
+from deadline import (
+    DeadlineExceeded,
+    expired,
+    get_deadline_headers,
+    get_timeout,
+    remaining,
+)
 from exceptions import ComponentException
 from fastapi import status
 from fastapi.exceptions import HTTPException
-from utils import REQUEST_TIMEOUT, create_url, form_scraper_request
+from metrics import track_stage
+from utils import create_url, form_scraper_request
 
 from shared.entities import (
     Config,
@@ -26,17 +43,63 @@ from shared.routes import LinkerRoutes, ScraperRoutes, SummarizerRoutes
 
 logger = logging.getLogger("supervisor")
 
+_summarizer_slots: dict[str, asyncio.Semaphore] = {}
+
+
+def get_summarizer_slots(summary_method: str) -> asyncio.Semaphore:
+    if summary_method not in _summarizer_slots:
+        settings = supervisor_settings.summarizer
+        limit = settings.method_concurrency_limits.get(
+            summary_method, settings.concurrency_limit
+        )
+        _summarizer_slots[summary_method] = asyncio.Semaphore(limit)
+    return _summarizer_slots[summary_method]
+
+
+async def reserve_summarizer_slot(
+    summary_method: str,
+) -> Callable[[], None] | None:
+    """Take summarizer slots for a hedged call if they are free right away."""
+    slots = get_summarizer_slots(summary_method)
+    if slots.locked():
+        return None
+    await slots.acquire()
+    admission = ctx.admission["summarizer"]
+    if not await admission.try_acquire():
+        slots.release()
+        return None
+
+    def release() -> None:
+        admission.release()
+        slots.release()
+
+    return release
+
+
+def admitted(component: str):
+    def decorator(call):
+        @functools.wraps(call)
+        async def wrapper(*args, **kwargs):
+            async with ctx.admission[component].slot(timeout=remaining()):
+                return await call(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
 
 # TODO(nrydanov): Add detailed verification for all possible situations (#80)
 def verifiable_request(call):
     async def wrapper(*args, **kwargs) -> dict:
         component_name = call.__name__[5:].upper()
         try:
-            response = await call(*args, **kwargs)
+            response = await asyncio.wait_for(
+                call(*args, **kwargs), remaining()
+            )
 
             match response.status_code:
                 case status.HTTP_200_OK:
-                    return response.json()
+                    return decode_response(response)
                 case status.HTTP_204_NO_CONTENT:
                     logger.warning(
                         f"Got no content response after sending request to {component_name}"
@@ -52,7 +115,14 @@ def verifiable_request(call):
                     code = response.status_code
                     debug = response.json()
                     error = debug["error"]
+        except DeadlineExceeded:
+            raise
         except Exception as e:
+            if expired():
+                logger.warning(
+                    f"Request deadline exceeded while waiting for {component_name}"
+                )
+                raise DeadlineExceeded() from e
             logger.error(f"Error sending request to {component_name}")
             code = None
             debug = {"error": traceback.format_exception(e)}
@@ -62,6 +132,36 @@ def verifiable_request(call):
     return wrapper
 
 
+async def sync_channels(link: str) -> list[dict] | None:
+    """Return channels of a folder, `None` if scraper failed to sync it."""
+    channels = await ctx.channel_sync.get(link)
+    if channels is not None:
+        return channels
+
+    version = ctx.channel_sync.version(link)
+
+    async def sync():
+        with track_stage("scraper_sync") as span:
+            response = await ctx.http.scraper.get(
+                create_url(
+                    network_settings.scraper_port,
+                    ScraperRoutes.SYNC + f"?link={link}",
+                    network_settings.scraper_host,
+                ),
+                timeout=get_timeout(),
+                headers=get_deadline_headers(),
+            )
+            span.size = len(response.content)
+        if response.status_code != httpx.codes.OK:
+            return None
+        channels = response.json()
+        await ctx.channel_sync.store(link, channels, version)
+        return channels
+
+    return await ctx.scraper_flight.do(link, sync)
+
+
+@admitted("scraper")
 @verifiable_request
 async def call_scraper(
     corr_id: UUID,
@@ -75,32 +175,30 @@ async def call_scraper(
     )
     logger.info("Creating a new scraper request")
 
-    preset: Preset = (
-        await ctx.preset_repo.get("preset_id", str(request.preset_id))
-    )[0]
+    preset: Preset = await ctx.entity_cache.get_preset(request.preset_id)
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            create_url(
-                network_settings.scraper_port,
-                ScraperRoutes.SYNC + f"?link={preset.chat_folder_link}",
-                network_settings.scraper_host,
-            )
-        )
+    channels = await sync_channels(preset.chat_folder_link)
 
-        # TODO(nrydanov): Move channel sync in seperate @verifiable_request
-        if response.status_code != httpx.codes.OK:
-            raise HTTPException(status_code=httpx.codes.BAD_REQUEST)
+    # TODO(nrydanov): Move channel sync in seperate @verifiable_request
+    if channels is None:
+        raise HTTPException(status_code=httpx.codes.BAD_REQUEST)
 
-        body = form_scraper_request(request, embedding_source, response.json())
-        return await client.post(
+    body = form_scraper_request(request, embedding_source, channels)
+    with track_stage("scraper_parse") as span:
+        response = await ctx.http.scraper.post(
             url,
             json=body,
-            timeout=REQUEST_TIMEOUT,
-            headers={"X-Request-ID": str(corr_id)},
+            timeout=get_timeout(),
+            headers={
+                "X-Request-ID": str(corr_id),
+                **get_deadline_headers(),
+            },
         )
+        span.size = len(response.content)
+    return response
 
 
+@admitted("linker")
 @verifiable_request
 async def call_linker(
     corr_id: UUID,
@@ -114,25 +212,71 @@ async def call_linker(
         config.method.value
     ]
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            create_url(
-                network_settings.linker_port,
-                LinkerRoutes.GET_STORIES,
-                network_settings.linker_host,
-            ),
-            json={
-                "entries": [e.model_dump() for e in entries],
-                "config": config.model_dump(),
-                "settings": settings["config"],
-                "return_plot_data": return_plot_data,
-            },
-            timeout=REQUEST_TIMEOUT,
-            headers={"X-Request-ID": str(corr_id)},
+    url = create_url(
+        network_settings.linker_port,
+        LinkerRoutes.GET_STORIES,
+        network_settings.linker_host,
+    )
+    body = {
+        "entries": [e.model_dump() for e in entries],
+        "config": config.model_dump(mode="json"),
+        "settings": settings["config"],
+        "return_plot_data": return_plot_data,
+    }
+    headers = {"X-Request-ID": str(corr_id), **get_deadline_headers()}
+
+    with track_stage("linker", size=len(entries)):
+        return await _post_linker(url, body, headers)
+
+
+async def _post_linker(url: str, body: dict, headers: dict) -> httpx.Response:
+    if ctx.linker_codec.enabled:
+        content, codec_headers = ctx.linker_codec.encode(body)
+        response = await ctx.http.linker.post(
+            url,
+            content=content,
+            timeout=get_timeout(),
+            headers=headers | codec_headers,
         )
-        return response
+        if response.status_code not in REJECTED_STATUSES:
+            return response
+        ctx.linker_codec.disable("LINKER")
+
+    response = await ctx.http.linker.post(
+        url,
+        json=body,
+        timeout=get_timeout(),
+        headers=headers,
+    )
+    return response
 
 
+async def link_entries(
+    corr_id: UUID,
+    entries: list[Entry],
+    config: LinkingConfig,
+    *,
+    return_plot_data: bool = False,
+):
+    # NOTE: Embeddings are determined by the source and the embedding source
+    # of the config, so they are left out of the key instead of being encoded
+    key = (
+        tuple(config),
+        return_plot_data,
+        tuple(
+            getattr(entry, "source_id", None) or entry.text
+            for entry in entries
+        ),
+    )
+    return await ctx.linker_flight.do(
+        key,
+        lambda: call_linker(
+            corr_id, entries, config, return_plot_data=return_plot_data
+        ),
+    )
+
+
+@admitted("summarizer")
 @verifiable_request
 async def call_summarizer(
     corr_id: UUID,
@@ -166,15 +310,59 @@ async def call_summarizer(
             "model": config.editor_model,
         }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            create_url(
-                network_settings.summarizer_port,
-                SummarizerRoutes.SUMMARIZE,
-                network_settings.summarizer_host,
-            ),
-            json=body,
-            timeout=REQUEST_TIMEOUT,
-            headers={"X-Request-ID": str(corr_id)},
-        )
+    async def summarize():
+        with track_stage("summarizer") as span:
+            response = await ctx.http.summarizer.post(
+                create_url(
+                    network_settings.summarizer_port,
+                    SummarizerRoutes.SUMMARIZE,
+                    network_settings.summarizer_host,
+                ),
+                json=body,
+                timeout=get_timeout(),
+                headers={
+                    "X-Request-ID": str(corr_id),
+                    **get_deadline_headers(),
+                },
+            )
+            span.size = len(response.content)
         return response
+
+    async with get_summarizer_slots(summary_method):
+        response = await ctx.summarizer_hedging.do(
+            f"{summary_method}:{density.value}",
+            summarize,
+            reserve=lambda: reserve_summarizer_slot(summary_method),
+        )
+    return response
+
+
+async def get_summary(
+    corr_id: UUID,
+    story: list[str],
+    config: Config,
+    density: Density,
+    preset: Preset,
+    edit: bool = True,
+):
+    key = ctx.summary_cache.make_key(
+        story,
+        density.value,
+        config.summary_method,
+        config.editor_model if edit else None,
+        preset.editor_prompt if edit else None,
+    )
+    summary = await ctx.summary_cache.get(key)
+    if summary is not None:
+        logger.debug(f"Serving {density.value} summary from cache")
+        return summary
+
+    async def summarize():
+        with track_stage(f"summarize_{density.value}", size=len(story)):
+            summary = await call_summarizer(
+                corr_id, story, config, density, preset, edit=edit
+            )
+        await ctx.summary_cache.set(key, summary)
+        return summary
+
+    return await ctx.summarizer_flight.do(key, summarize)
@@ -1,3 +1,4 @@
+from cache import EntityCache
 from context import ctx
 from fastapi import APIRouter
 
@@ -20,6 +21,7 @@ async def add_config(request: ConfigPostRequest):
             inactive=False,
         ),
     )
+    await ctx.entity_cache.invalidate(EntityCache.CONFIG)
 
 
 @router.patch(SupervisorRoutes.CONFIG, status_code=204)
@@ -27,4 +29,5 @@ async def drop_config(config_id: int):
     config = (await ctx.config_repo.get("config_id", config_id))[0]
     config.inactive = True
 
-    return await ctx.config_repo.update(config, ["inactive"])
+    await ctx.config_repo.update(config, ["inactive"])
+    await ctx.entity_cache.invalidate(EntityCache.CONFIG)
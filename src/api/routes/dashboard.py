@@ -1,9 +1,10 @@
 import logging
 from uuid import UUID
 
-from api.requests import call_linker
+from api.codec import to_builtin
+from api.requests import link_entries
 from context import ctx, linking_settings
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, status
 from pydantic import TypeAdapter
 
 from shared.entities import Config, Request, StorySources
@@ -32,11 +33,7 @@ async def get_used_config(uuid: UUID):
         # TODO(nrydanov): Add proper handling
         pass
 
-    configs: list[Config] = await ctx.config_repo.get(
-        "config_id", reqs[0].config_id
-    )
-
-    config = configs[0]
+    config: Config = await ctx.entity_cache.get_config(reqs[0].config_id)
 
     settings = linking_settings.model_dump()[config.embedding_source][
         config.categorize_method
@@ -49,6 +46,46 @@ async def get_used_config(uuid: UUID):
     )
 
 
+@router.get(SupervisorRoutes.DASH + "/timeline")
+async def get_request_timeline(uuid: UUID):
+    timeline = await ctx.timelines.get(uuid)
+    if timeline is None:
+        raise HTTPException(
+            status.HTTP_404_NOT_FOUND, detail="Request timeline not found"
+        )
+    return timeline
+
+
+@router.get(SupervisorRoutes.DASH + "/cache")
+async def get_cache_stats():
+    return {
+        "summary": ctx.summary_cache.stats(),
+        "channel_sync": ctx.channel_sync.stats(),
+    }
+
+
+@router.get(SupervisorRoutes.DASH + "/coalescing")
+async def get_coalescing_stats():
+    return {
+        "scraper": ctx.scraper_flight.stats(),
+        "linker": ctx.linker_flight.stats(),
+        "summarizer": ctx.summarizer_flight.stats(),
+    }
+
+
+@router.get(SupervisorRoutes.DASH + "/admission")
+async def get_admission_stats():
+    return {
+        component: limiter.stats()
+        for component, limiter in ctx.admission.items()
+    }
+
+
+@router.get(SupervisorRoutes.DASH + "/hedging")
+async def get_hedging_stats():
+    return {"summarizer": ctx.summarizer_hedging.stats()}
+
+
 @router.post(SupervisorRoutes.DASH)
 async def get_dashboard_data(uuid: UUID, config: LinkingConfig):
     data: list[StorySources] = await ctx.ss_view.get("request_id", uuid)
@@ -59,12 +96,12 @@ async def get_dashboard_data(uuid: UUID, config: LinkingConfig):
             data,
         )
     )
-    response = await call_linker(uuid, entries, config, return_plot_data=True)
+    response = await link_entries(uuid, entries, config, return_plot_data=True)
 
     return adapter.validate_python(
         {
             "payload": data,
-            "results": response["results"],
-            "embeddings": response["embeddings"],
+            "results": to_builtin(response["results"]),
+            "embeddings": to_builtin(response["embeddings"]),
         }
     )
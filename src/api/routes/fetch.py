@@ -0,0 +1,24 @@
+from uuid import UUID
+
+from context import ctx
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from shared.routes import SupervisorRoutes
+
+router = APIRouter()
+
+
+@router.post(SupervisorRoutes.FETCH + "/{request_id}/cancel")
+async def cancel_fetch(request_id: UUID):
+    if await ctx.fetch_jobs.cancel(request_id) or await ctx.fetches.cancel(
+        request_id
+    ):
+        return {"request_id": request_id, "status": "cancelled"}
+
+    # NOTE: The fetch may be running on another replica, which gets the
+    # cancellation request over Redis
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"request_id": str(request_id), "status": "requested"},
+    )
@@ -0,0 +1,37 @@
+from uuid import UUID
+
+from context import ctx
+from fastapi import APIRouter, HTTPException, Query, status
+
+from shared.models import FetchRequest
+from shared.routes import SupervisorRoutes
+
+router = APIRouter()
+
+MAX_WAIT_SEC = 120
+
+
+@router.post(
+    SupervisorRoutes.FETCH + "/jobs", status_code=status.HTTP_202_ACCEPTED
+)
+async def submit_fetch_job(request: FetchRequest):
+    job_id = await ctx.fetch_jobs.submit(request)
+    return {"job_id": job_id}
+
+
+@router.get(SupervisorRoutes.FETCH + "/jobs/{job_id}")
+async def get_fetch_job(job_id: UUID):
+    state = await ctx.fetch_jobs.get(job_id)
+    if state is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return state
+
+
+@router.get(SupervisorRoutes.FETCH + "/jobs/{job_id}/wait")
+async def wait_fetch_job(
+    job_id: UUID, timeout: float = Query(30, gt=0, le=MAX_WAIT_SEC)
+):
+    state = await ctx.fetch_jobs.wait(job_id, timeout)
+    if state is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return state
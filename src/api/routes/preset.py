@@ -2,15 +2,15 @@ from datetime import datetime
 from typing import Any
 from uuid import uuid4
 
-import httpx
-from context import ctx, network_settings
+from api.requests import sync_channels
+from cache import EntityCache
+from context import ctx
 from fastapi import APIRouter
 from pydantic import TypeAdapter
-from utils import create_url
 
 from shared.entities import Preset, UserPreset
 from shared.models import PartialPresetUpdate, PresetData
-from shared.routes import ScraperRoutes, SupervisorRoutes
+from shared.routes import SupervisorRoutes
 from shared.utils import DB_DATE_FORMAT
 
 router = APIRouter()
@@ -37,22 +37,19 @@ async def update_preset(request: PartialPresetUpdate):
     request_dump.pop("chat_id")
     keys = request_dump.keys()
 
-    return await ctx.preset_repo.update(
+    await ctx.preset_repo.update(
         TypeAdapter(Preset).validate_python(preset_dump), list(keys)
     )
+    await ctx.entity_cache.invalidate(EntityCache.PRESET, request.preset_id)
+    if request.chat_folder_link is not None:
+        await ctx.channel_sync.invalidate(preset.chat_folder_link)
+        await ctx.channel_sync.invalidate(request.chat_folder_link)
 
 
 @router.post(SupervisorRoutes.PRESET, status_code=200)
 async def add_preset(chat_id: int, preset: PresetData):
     preset_id = uuid4()
-    async with httpx.AsyncClient() as client:
-        await client.get(
-            create_url(
-                network_settings.scraper_port,
-                ScraperRoutes.SYNC + f"?link={preset.chat_folder_link}",
-                network_settings.scraper_host,
-            )
-        )
+    await sync_channels(preset.chat_folder_link)
 
     await ctx.preset_repo.add(
         Preset(
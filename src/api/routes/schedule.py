@@ -45,6 +45,7 @@ async def add_schedule_entry(request: SchedulePostRequest):
     )
 
     await ctx.schedule_repo.add(schedule)
+    await ctx.scheduler.record_change(schedule_id)
     return schedule_id
 
 
@@ -75,3 +76,4 @@ async def update_schedule(request: PartialScheduleUpdate):
     await ctx.schedule_repo.update(
         TypeAdapter(Schedule).validate_python(schedule_dump), list(keys)
     )
+    await ctx.scheduler.record_change(request.schedule_id)
@@ -2,14 +2,31 @@ from uuid import UUID
 
 import httpx
 from context import ctx
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 
+from db import STORY_SOURCES_VIEW, SUMMARY_TABLE, select_by_ids
+from shared.entities import StorySources, Summary
 from shared.models import Density
 from shared.routes import SupervisorRoutes
 
 router = APIRouter()
 
 
+def _get_references(sources: list[StorySources]) -> list[str]:
+    return list(map(lambda x: x.reference, sources))
+
+
+def _format_summary(
+    references: list[str], small_summary: Summary, large_summary: Summary
+) -> dict:
+    return {
+        "references": references,
+        "small": small_summary.summary,
+        "large": large_summary.summary,
+        "title": large_summary.title,
+    }
+
+
 @router.get(SupervisorRoutes.SUMMARIZE)
 async def get_cached_summary(summary_id: UUID):
     summaries = await ctx.summary_repo.get("summary_id", summary_id)
@@ -18,7 +35,7 @@ async def get_cached_summary(summary_id: UUID):
         raise HTTPException(status_code=httpx.codes.BAD_REQUEST)
 
     sources = await ctx.ss_view.get("story_id", summaries[0].story_id)
-    references = list(map(lambda x: x.reference, sources))
+    references = _get_references(sources)
 
     small_summary = list(
         filter(lambda x: x.density == Density.SMALL, summaries)
@@ -28,9 +45,53 @@ async def get_cached_summary(summary_id: UUID):
         filter(lambda x: x.density == Density.LARGE, summaries)
     )[0]
 
+    return _format_summary(references, small_summary, large_summary)
+
+
+@router.get(SupervisorRoutes.SUMMARIZE + "/batch")
+async def get_cached_summaries(summary_id: list[UUID] = Query()):
+    summaries: dict[UUID, list[Summary]] = await select_by_ids(
+        SUMMARY_TABLE, Summary, "summary_id", summary_id
+    )
+    densities: dict[UUID, dict[Density, Summary]] = {
+        summary_id: {summary.density: summary for summary in rows}
+        for summary_id, rows in summaries.items()
+        if rows
+    }
+    complete = {
+        summary_id: by_density
+        for summary_id, by_density in densities.items()
+        if Density.SMALL in by_density and Density.LARGE in by_density
+    }
+    sources: dict[UUID, list[StorySources]] = await select_by_ids(
+        STORY_SOURCES_VIEW,
+        StorySources,
+        "story_id",
+        [
+            by_density[Density.SMALL].story_id
+            for by_density in complete.values()
+        ],
+    )
+
     return {
-        "references": references,
-        "small": small_summary.summary,
-        "large": large_summary.summary,
-        "title": large_summary.title,
+        "summaries": {
+            summary_id: _format_summary(
+                sorted(
+                    _get_references(
+                        sources[by_density[Density.SMALL].story_id]
+                    )
+                ),
+                by_density[Density.SMALL],
+                by_density[Density.LARGE],
+            )
+            for summary_id, by_density in complete.items()
+        },
+        "missing_summary_ids": [
+            summary_id for summary_id, rows in summaries.items() if not rows
+        ],
+        "incomplete_summary_ids": [
+            summary_id
+            for summary_id in densities
+            if summary_id not in complete
+        ],
     }
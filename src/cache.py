@@ -0,0 +1,310 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Final
+
+from fastapi import HTTPException, status
+from pubsub import listen
+
+from config import ChannelSyncSettings
+from redis.asyncio import Redis
+from shared.db import PgRepository
+from shared.entities import Config, Preset
+
+logger = logging.getLogger("supervisor")
+
+
+class LRUCache:
+    """In-process cache bounded both by entry count and by entry age."""
+
+    def __init__(self, max_size: int, ttl_sec: float):
+        self.max_size = max_size
+        self.ttl_sec = ttl_sec
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl_sec, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TwoLevelCache:
+    """Cache of JSON values in an in-process LRU backed by Redis.
+
+    Lookups go to the in-process LRU first and to Redis after that, both
+    levels expire entries after `ttl_sec`. Redis failures are logged and
+    treated as misses.
+    """
+
+    NAME = "cache"
+    KEY_PREFIX = "cache:"
+
+    def __init__(
+        self,
+        redis: Redis,
+        max_size: int,
+        ttl_sec: int,
+        enabled: bool = True,
+    ):
+        self.redis = redis
+        self.ttl_sec = ttl_sec
+        self.enabled = enabled
+        self.local = LRUCache(max_size, ttl_sec)
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Any | None:
+        if not self.enabled:
+            return None
+
+        value = self.local.get(key)
+        if value is not None:
+            self.local_hits += 1
+            return value
+
+        try:
+            raw = await self.redis.get(self.KEY_PREFIX + key)
+        except Exception as e:
+            logger.warning(f"Failed to read {self.NAME} from Redis: {e}")
+            raw = None
+
+        if raw is None:
+            self.misses += 1
+            return None
+
+        value = json.loads(raw)
+        self.local.set(key, value)
+        self.redis_hits += 1
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+
+        self.local.set(key, value)
+        try:
+            await self.redis.set(
+                self.KEY_PREFIX + key, json.dumps(value), ex=self.ttl_sec
+            )
+        except Exception as e:
+            logger.warning(f"Failed to write {self.NAME} to Redis: {e}")
+
+    async def delete(self, key: str) -> None:
+        self.local.pop(key)
+        try:
+            await self.redis.delete(self.KEY_PREFIX + key)
+        except Exception as e:
+            logger.warning(f"Failed to delete {self.NAME} from Redis: {e}")
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self.local),
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+        }
+
+
+class SummaryCache(TwoLevelCache):
+    """Two-level cache of summarizer responses.
+
+    Keys are content hashes of every input that affects the summarizer
+    output.
+    """
+
+    NAME = "summary cache"
+    KEY_PREFIX = "summary-cache:"
+
+    @staticmethod
+    def make_key(
+        story: list[str],
+        density: str,
+        summary_method: str,
+        editor_model: str | None,
+        editor_prompt: str | None,
+    ) -> str:
+        payload = json.dumps(
+            [story, density, summary_method, editor_model, editor_prompt],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class EntityCache:
+    """Read-through in-memory snapshots of `Config` and `Preset` rows.
+
+    Configs are loaded all at once and indexed by ID, presets are loaded one
+    by one on first access. Writers call `invalidate`, which drops local
+    entries and broadcasts the invalidation to other replicas over Redis.
+    """
+
+    CHANNEL_NAME: Final[str] = "entity-invalidation"
+    CONFIG: Final[str] = "config"
+    PRESET: Final[str] = "preset"
+
+    def __init__(
+        self,
+        redis: Redis,
+        config_repo: PgRepository,
+        preset_repo: PgRepository,
+    ):
+        self.redis = redis
+        self.config_repo = config_repo
+        self.preset_repo = preset_repo
+        self._configs: dict[int, Config] | None = None
+        self._presets: dict[str, Preset] = {}
+        self._version = 0
+
+    async def get_configs(self) -> list[Config]:
+        if self._configs is None:
+            version = self._version
+            configs: list[Config] = await self.config_repo.get()
+            snapshot = {config.config_id: config for config in configs}
+            if version != self._version:
+                return list(snapshot.values())
+            self._configs = snapshot
+        return list(self._configs.values())
+
+    async def get_config(self, config_id: int) -> Config:
+        if self._configs is None:
+            await self.get_configs()
+        if self._configs is None:
+            configs = await self.config_repo.get("config_id", config_id)
+            config = configs[0] if configs else None
+        else:
+            config = self._configs.get(config_id)
+        if config is None:
+            raise HTTPException(
+                status.HTTP_404_NOT_FOUND, detail="Config not found"
+            )
+        return config
+
+    async def get_preset(self, preset_id) -> Preset:
+        key = str(preset_id)
+        preset = self._presets.get(key)
+        if preset is None:
+            version = self._version
+            presets: list[Preset] = await self.preset_repo.get(
+                "preset_id", key
+            )
+            if not presets:
+                raise HTTPException(
+                    status.HTTP_404_NOT_FOUND, detail="Preset not found"
+                )
+            preset = presets[0]
+            if version == self._version:
+                self._presets[key] = preset
+        return preset
+
+    def drop(self, kind: str, key: str | None = None) -> None:
+        self._version += 1
+        match kind:
+            case self.CONFIG:
+                self._configs = None
+            case self.PRESET if key is not None:
+                self._presets.pop(key, None)
+            case self.PRESET:
+                self._presets.clear()
+
+    async def invalidate(self, kind: str, key=None) -> None:
+        key = None if key is None else str(key)
+        self.drop(kind, key)
+        try:
+            await self.redis.publish(
+                self.CHANNEL_NAME, json.dumps({"kind": kind, "key": key})
+            )
+        except Exception as e:
+            logger.warning(f"Failed to broadcast {kind} invalidation: {e}")
+
+    def drop_all(self) -> None:
+        self.drop(self.CONFIG)
+        self.drop(self.PRESET)
+
+    async def listen(self) -> None:
+        await listen(
+            self.redis,
+            self.CHANNEL_NAME,
+            lambda data: self.drop(data["kind"], data["key"]),
+            "entity cache invalidation",
+            # NOTE: Updates may have been missed while disconnected
+            on_reconnect=self.drop_all,
+        )
+
+
+class ChannelSyncCache(TwoLevelCache):
+    """Two-level cache of scraper channel sync results keyed by folder link.
+
+    Writers call `invalidate` when a folder link changes, which drops the
+    entry locally and in Redis and broadcasts the invalidation to the local
+    caches of other replicas.
+    """
+
+    NAME = "channel sync cache"
+    KEY_PREFIX = "channel-sync:"
+    CHANNEL_NAME: Final[str] = "channel-sync-invalidation"
+
+    def __init__(self, redis: Redis, settings: ChannelSyncSettings):
+        super().__init__(
+            redis, settings.max_size, settings.ttl, settings.enabled
+        )
+        self._versions: dict[str, int] = {}
+
+    def version(self, link: str) -> int:
+        return self._versions.get(link, 0)
+
+    async def store(
+        self, link: str, channels: list[dict], version: int
+    ) -> None:
+        """Store channels unless the link was invalidated since `version`."""
+        if version == self.version(link):
+            await self.set(link, channels)
+
+    def drop(self, link: str) -> None:
+        self._versions[link] = self.version(link) + 1
+        self.local.pop(link)
+
+    async def invalidate(self, link: str) -> None:
+        self.drop(link)
+        await self.delete(link)
+        try:
+            await self.redis.publish(
+                self.CHANNEL_NAME, json.dumps({"link": link})
+            )
+        except Exception as e:
+            logger.warning(f"Failed to broadcast invalidation of {link}: {e}")
+
+    async def listen(self) -> None:
+        await listen(
+            self.redis,
+            self.CHANNEL_NAME,
+            lambda data: self.drop(data["link"]),
+            "channel sync invalidation",
+            # NOTE: Invalidations may have been missed while disconnected
+            on_reconnect=self.local.clear,
+        )
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import logging
+from typing import Any, Coroutine, Final
+from uuid import UUID
+
+from exceptions import FetchCancelled
+from fastapi.requests import Request
+from pubsub import listen
+
+from config import CancellationSettings
+from redis.asyncio import Redis
+
+logger = logging.getLogger("supervisor")
+
+
+class FetchRegistry:
+    """In-flight fetches keyed by correlation ID, which can be cancelled.
+
+    A fetch is cancelled when its client disconnects or on an explicit
+    `cancel`. Cancellation requests for fetches running on another replica
+    are broadcast over Redis.
+    """
+
+    CHANNEL_NAME: Final[str] = "fetch-cancellation"
+
+    def __init__(self, redis: Redis, settings: CancellationSettings):
+        self.redis = redis
+        self.settings = settings
+        self._tasks: dict[str, list[asyncio.Future]] = {}
+        self._cancelled: set[str] = set()
+
+    async def run(
+        self,
+        fetch_id: UUID,
+        coro: Coroutine[Any, Any, Any],
+        request: Request | None = None,
+    ) -> Any:
+        key = str(fetch_id)
+        tasks = [asyncio.ensure_future(coro)]
+        self.register(key, tasks)
+        watcher = (
+            asyncio.ensure_future(self._watch(key, request))
+            if request is not None
+            else None
+        )
+        try:
+            return await tasks[0]
+        except asyncio.CancelledError:
+            if key in self._cancelled:
+                raise FetchCancelled(fetch_id) from None
+            raise
+        finally:
+            self.unregister(key, tasks)
+            if watcher is not None:
+                watcher.cancel()
+
+    def register(self, key: str, futures: list[asyncio.Future]) -> None:
+        """Register futures of a fetch, all of them are cancelled together."""
+        self._tasks[key] = futures
+
+    def unregister(self, key: str, futures: list[asyncio.Future]) -> None:
+        if self._tasks.get(key) is futures:
+            del self._tasks[key]
+            self._cancelled.discard(key)
+
+    async def _watch(self, key: str, request: Request) -> None:
+        while not await request.is_disconnected():
+            await asyncio.sleep(self.settings.poll_interval)
+        logger.warning(f"Client of fetch {key} disconnected, cancelling it")
+        self.cancel_local(key)
+
+    def cancel_local(self, key: str) -> bool:
+        futures = self._tasks.get(key)
+        if futures is None or all(future.done() for future in futures):
+            return False
+        self._cancelled.add(key)
+        for future in futures:
+            future.cancel()
+        return True
+
+    async def cancel(self, fetch_id: UUID) -> bool:
+        """Cancel a fetch, return whether it was running on this replica."""
+        key = str(fetch_id)
+        if self.cancel_local(key):
+            logger.info(f"Cancelled fetch {key}")
+            return True
+        await self.redis.publish(self.CHANNEL_NAME, json.dumps({"key": key}))
+        return False
+
+    def _on_message(self, data: dict) -> None:
+        if self.cancel_local(data["key"]):
+            logger.info(f"Cancelled fetch {data['key']} on request")
+
+    async def listen(self) -> None:
+        await listen(
+            self.redis,
+            self.CHANNEL_NAME,
+            self._on_message,
+            "fetch cancellation",
+        )
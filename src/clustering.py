@@ -1,10 +1,11 @@
 from uuid import UUID, uuid4
 
-from api.requests import call_linker
+from api.requests import link_entries
 from context import (
     ctx,
     linking_settings,
 )
+from metrics import track_stage
 from utils import link_entity
 
 from shared.entities import (
@@ -32,16 +33,17 @@ async def clusterize(
     )
 
     weights = ctx.shared_settings.config.ranking.weights
-    response = await call_linker(request_id, entries, linking_config)
+    response = await link_entries(request_id, entries, linking_config)
     unsorted_category_nums = response["results"][0]["stories_nums"]
     uuids = [uuid4() for _ in range(len(unsorted_category_nums))]
-    clusters = ctx.ranker.get_sorted(
-        zip(
-            uuids,
-            link_entity(unsorted_category_nums, entries),
-            strict=True,
-        ),
-        weights=weights,
-    )
+    with track_stage("ranking", size=len(entries)):
+        clusters = ctx.ranker.get_sorted(
+            zip(
+                uuids,
+                link_entity(unsorted_category_nums, entries),
+                strict=True,
+            ),
+            weights=weights,
+        )
 
     return clusters
@@ -1,3 +1,5 @@
+from enum import Enum
+
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings
 
@@ -46,3 +48,129 @@ class LinkingSettings(JSONSettings):
 
     def __init__(self, path: str):
         super().__init__(path)
+
+
+class ComponentPoolSettings(BaseModel):
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+
+
+class HttpSettings(BaseModel):
+    scraper: ComponentPoolSettings = ComponentPoolSettings()
+    linker: ComponentPoolSettings = ComponentPoolSettings()
+    summarizer: ComponentPoolSettings = ComponentPoolSettings()
+
+
+class HedgingSettings(BaseModel):
+    enabled: bool = False
+    percentile: float = 95
+    min_samples: int = 20
+    window: int = 200
+    min_delay: float = 0.5
+    budget: float = 0.05
+    max_burst: float = 5
+
+
+class SummarizerSettings(BaseModel):
+    concurrency_limit: int = 8
+    method_concurrency_limits: dict[str, int] = {}
+    batch_concurrency: int = 4
+    hedging: HedgingSettings = HedgingSettings()
+
+
+class SummaryCacheSettings(BaseModel):
+    enabled: bool = True
+    max_size: int = 4096
+    ttl: int = 86400
+
+
+class BinaryTransportSettings(BaseModel):
+    enabled: bool = False
+    float16: bool = False
+    zstd: bool = False
+    zstd_level: int = 3
+
+
+class CoordinationMode(str, Enum):
+    NONE = "none"
+    LEADER = "leader"
+    SHARDED = "sharded"
+
+
+class DispatchMode(str, Enum):
+    PUBSUB = "pubsub"
+    STREAM = "stream"
+
+
+class SchedulerSettings(BaseModel):
+    resync_interval: int = 30
+    changes_key: str = "scheduler:changes"
+    change_log_ttl: int = 3600
+    dispatch_batch_size: int = 1000
+    coordination: CoordinationMode = CoordinationMode.NONE
+    lease_ttl: int = 30
+    lease_key: str = "scheduler:leader"
+    shard_key: str = "scheduler:replicas"
+    dispatch: DispatchMode = DispatchMode.PUBSUB
+    stream_name: str = "scheduled-stream"
+    stream_group: str = "digest"
+    stream_max_len: int = 100000
+
+
+class FetchJobSettings(BaseModel):
+    workers: int = 4
+    queue_size: int = 64
+    ttl: int = 3600
+    poll_interval: float = 0.5
+    retry_after: int = 5
+
+
+class AdmissionSettings(BaseModel):
+    max_concurrency: int = 32
+    max_queue: int = 128
+    retry_after: int = 5
+
+
+class ComponentAdmissionSettings(BaseModel):
+    scraper: AdmissionSettings = AdmissionSettings()
+    linker: AdmissionSettings = AdmissionSettings()
+    summarizer: AdmissionSettings = AdmissionSettings()
+
+
+class DeadlineSettings(BaseModel):
+    fetch: float = 300
+    summarize: float = 120
+
+
+class CancellationSettings(BaseModel):
+    poll_interval: float = 1.0
+
+
+class TimelineSettings(BaseModel):
+    enabled: bool = True
+    ttl: int = 604800
+
+
+class ChannelSyncSettings(BaseModel):
+    enabled: bool = True
+    max_size: int = 1024
+    ttl: int = 600
+
+
+class SupervisorSettings(JSONSettings):
+    http: HttpSettings = HttpSettings()
+    summarizer: SummarizerSettings = SummarizerSettings()
+    summary_cache: SummaryCacheSettings = SummaryCacheSettings()
+    linker_transport: BinaryTransportSettings = BinaryTransportSettings()
+    scheduler: SchedulerSettings = SchedulerSettings()
+    fetch_jobs: FetchJobSettings = FetchJobSettings()
+    admission: ComponentAdmissionSettings = ComponentAdmissionSettings()
+    deadlines: DeadlineSettings = DeadlineSettings()
+    timeline: TimelineSettings = TimelineSettings()
+    cancellation: CancellationSettings = CancellationSettings()
+    channel_sync: ChannelSyncSettings = ChannelSyncSettings()
+
+    def __init__(self, path: str):
+        super().__init__(path)
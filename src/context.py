@@ -2,10 +2,25 @@ import asyncio
 import logging
 import os
 
-from ranking import Ranker, init_scorers
+from admission import AdmissionLimiter
+from api.clients import ComponentClients
+from api.coalescing import SingleFlight
+from api.codec import BinaryCodec
+from api.hedging import HedgingPolicy
+from cache import ChannelSyncCache, EntityCache, SummaryCache
+from cancellation import FetchRegistry
+from coordination import create_coordinator
+from dispatch import create_dispatcher
+from jobs import FetchJobPool
+from ranking import VectorRanker, init_scorers
 from scheduler import Scheduler
+from timeline import TimelineStore
 
-from config import LinkingSettings, NetworkSettings
+from config import (
+    LinkingSettings,
+    NetworkSettings,
+    SupervisorSettings,
+)
 from redis.asyncio import Redis
 from shared.db import Database, PgRepository, create_db_string
 from shared.entities import (
@@ -29,6 +44,7 @@ from shared.utils import SHARED_CONFIG_PATH
 
 network_settings = NetworkSettings(_env_file="config/network.cfg")
 linking_settings = LinkingSettings("config/linker_config.json")
+supervisor_settings = SupervisorSettings("config/supervisor_config.json")
 
 logger = logging.getLogger("supervisor")
 
@@ -50,6 +66,12 @@ class Context:
             password=os.getenv("REDIS_PASSWORD"),
             username=os.getenv("REDIS_USERNAME"),
         )
+        self.summary_cache = SummaryCache(
+            self.redis,
+            max_size=supervisor_settings.summary_cache.max_size,
+            ttl_sec=supervisor_settings.summary_cache.ttl,
+            enabled=supervisor_settings.summary_cache.enabled,
+        )
         self.callback_repository = PgRepository(self.pg, Callback)
         self.preset_view = PgRepository(self.pg, UserPresets)
         self.user_repo = PgRepository(self.pg, User)
@@ -64,12 +86,59 @@ class Context:
         self.story_repo = PgRepository(self.pg, Story)
         self.schedule_repo = PgRepository(self.pg, Schedule)
         self.schedule_view = PgRepository(self.pg, ScheduledPreset)
-        self.ranker = Ranker(init_scorers())
+        self.http = ComponentClients(supervisor_settings.http)
+        self.linker_codec = BinaryCodec(supervisor_settings.linker_transport)
+        self.admission = {
+            component: AdmissionLimiter(
+                component.upper(),
+                getattr(supervisor_settings.admission, component),
+            )
+            for component in ComponentClients.COMPONENTS
+        }
+        self.scraper_flight = SingleFlight("scraper")
+        self.linker_flight = SingleFlight("linker")
+        self.summarizer_flight = SingleFlight("summarizer")
+        self.summarizer_hedging = HedgingPolicy(
+            "summarizer", supervisor_settings.summarizer.hedging
+        )
+        self.entity_cache = EntityCache(
+            self.redis, self.config_repo, self.preset_repo
+        )
+        self.channel_sync = ChannelSyncCache(
+            self.redis, supervisor_settings.channel_sync
+        )
+        self.timelines = TimelineStore(
+            self.redis, supervisor_settings.timeline
+        )
+        self.fetches = FetchRegistry(
+            self.redis, supervisor_settings.cancellation
+        )
+        self.fetch_jobs = FetchJobPool(
+            self.redis, supervisor_settings.fetch_jobs
+        )
+        self.ranker = VectorRanker(init_scorers())
         self.scheduler = Scheduler(
+            self.pg,
             self.schedule_view,
             self.redis,
             timeout_sec=self.shared_settings.config.scheduler.timeout,
             interval_sec=self.shared_settings.config.scheduler.interval,
+            resync_interval_sec=(
+                supervisor_settings.scheduler.resync_interval
+            ),
+            changes_key=supervisor_settings.scheduler.changes_key,
+            change_log_ttl_sec=supervisor_settings.scheduler.change_log_ttl,
+            batch_size=supervisor_settings.scheduler.dispatch_batch_size,
+            coordinator=create_coordinator(
+                self.redis,
+                supervisor_settings.scheduler,
+                self.shared_settings.config.scheduler.timeout,
+            ),
+            dispatcher=create_dispatcher(
+                self.redis,
+                supervisor_settings.scheduler,
+                Scheduler.CHANNEL_NAME,
+            ),
         )
 
     async def init_db(self) -> None:
@@ -78,6 +147,29 @@ class Context:
     async def dispose_db(self) -> None:
         await self.pg.disconnect()
 
+    async def init_http(self) -> None:
+        await self.http.open()
+
+    async def dispose_http(self) -> None:
+        await self.http.close()
+
+    async def start_listeners(self):
+        loop = asyncio.get_event_loop()
+        self.listener_tasks = [
+            loop.create_task(listener, name=name)
+            for name, listener in (
+                ("Entity Cache Listener", self.entity_cache.listen()),
+                ("Channel Sync Listener", self.channel_sync.listen()),
+                ("Fetch Cancellation Listener", self.fetches.listen()),
+                ("Schedule Change Listener", self.scheduler.listen()),
+            )
+        ]
+
+    async def stop_listeners(self):
+        for task in self.listener_tasks:
+            task.cancel()
+        await asyncio.gather(*self.listener_tasks)
+
     async def start_scheduler(self):
         loop = asyncio.get_event_loop()
         self.scheduler_task = loop.create_task(
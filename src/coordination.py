@@ -0,0 +1,191 @@
+import logging
+import math
+import os
+import time
+from uuid import UUID, uuid4
+
+from config import CoordinationMode, SchedulerSettings
+from redis.asyncio import Redis
+
+logger = logging.getLogger("supervisor")
+
+
+def create_replica_id() -> str:
+    return f"{os.getenv('HOSTNAME', 'supervisor')}:{os.getpid()}:{uuid4()}"
+
+
+class NoCoordination:
+    """Every replica dispatches every schedule."""
+
+    def __init__(self):
+        self.changed = False
+
+    async def acquire(self) -> bool:
+        return True
+
+    async def verify(self) -> bool:
+        """Check right before dispatching that ownership is still held."""
+        return True
+
+    def owns(self, schedule_id: UUID) -> bool:
+        return True
+
+    async def release(self) -> None:
+        pass
+
+
+class LeaderLease(NoCoordination):
+    """Redis lease which lets only one replica run the scheduler.
+
+    The lease is a key holding the replica ID with a TTL. The leader renews
+    it on every `acquire`; once it expires, any other replica may take it.
+    """
+
+    RENEW_SCRIPT = """
+    if redis.call("get", KEYS[1]) == ARGV[1] then
+        return redis.call("pexpire", KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+    RELEASE_SCRIPT = """
+    if redis.call("get", KEYS[1]) == ARGV[1] then
+        return redis.call("del", KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, redis: Redis, key: str, ttl_sec: int, replica_id: str):
+        super().__init__()
+        self.redis = redis
+        self.key = key
+        self.ttl_ms = ttl_sec * 1000
+        self.replica_id = replica_id
+        self.is_leader = False
+
+    async def acquire(self) -> bool:
+        was_leader = self.is_leader
+        if was_leader:
+            self.is_leader = bool(
+                await self.redis.eval(
+                    self.RENEW_SCRIPT,
+                    1,
+                    self.key,
+                    self.replica_id,
+                    self.ttl_ms,
+                )
+            )
+        if not self.is_leader:
+            self.is_leader = bool(
+                await self.redis.set(
+                    self.key, self.replica_id, nx=True, px=self.ttl_ms
+                )
+            )
+
+        if self.is_leader != was_leader:
+            # NOTE: Another leader might have dispatched schedules meanwhile
+            self.changed = True
+            if self.is_leader:
+                logger.info("Acquired scheduler leader lease")
+            else:
+                logger.info("Lost scheduler leader lease")
+        return self.is_leader
+
+    async def verify(self) -> bool:
+        renewed = self.is_leader and bool(
+            await self.redis.eval(
+                self.RENEW_SCRIPT, 1, self.key, self.replica_id, self.ttl_ms
+            )
+        )
+        if self.is_leader and not renewed:
+            self.is_leader = False
+            self.changed = True
+            logger.info("Lost scheduler leader lease")
+        return renewed
+
+    async def release(self) -> None:
+        if self.is_leader:
+            await self.redis.eval(
+                self.RELEASE_SCRIPT, 1, self.key, self.replica_id
+            )
+            self.is_leader = False
+            logger.info("Released scheduler leader lease")
+
+
+class ShardedCoordination(NoCoordination):
+    """Splits schedules between live replicas by schedule ID hash.
+
+    Replicas announce themselves with heartbeats in a Redis sorted set.
+    Members which didn't send a heartbeat within the TTL are considered dead.
+    """
+
+    def __init__(self, redis: Redis, key: str, ttl_sec: int, replica_id: str):
+        super().__init__()
+        self.redis = redis
+        self.key = key
+        self.ttl_sec = ttl_sec
+        self.replica_id = replica_id
+        self.members: list[str] = []
+        self.position = 0
+
+    async def acquire(self) -> bool:
+        now = time.time()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(self.key, {self.replica_id: now})
+            pipe.zremrangebyscore(self.key, "-inf", now - self.ttl_sec)
+            pipe.zrange(self.key, 0, -1)
+            *_, members = await pipe.execute()
+
+        members = sorted(
+            m.decode() if isinstance(m, bytes) else m for m in members
+        )
+        if members != self.members:
+            self.changed = True
+            self.members = members
+            self.position = members.index(self.replica_id)
+            logger.info(
+                f"Scheduler shard {self.position + 1}/{len(members)} "
+                "is assigned to this replica"
+            )
+        return True
+
+    async def verify(self) -> bool:
+        await self.acquire()
+        return not self.changed
+
+    def owns(self, schedule_id: UUID) -> bool:
+        if not self.members:
+            return False
+        return schedule_id.int % len(self.members) == self.position
+
+    async def release(self) -> None:
+        await self.redis.zrem(self.key, self.replica_id)
+        self.members = []
+        logger.info("Left scheduler shard membership")
+
+
+def create_coordinator(
+    redis: Redis, settings: SchedulerSettings, timeout_sec: float
+) -> NoCoordination:
+    lease_ttl = settings.lease_ttl
+    if (
+        settings.coordination != CoordinationMode.NONE
+        and timeout_sec >= lease_ttl
+    ):
+        # NOTE: Otherwise the lease expires between scheduler iterations
+        lease_ttl = math.ceil(timeout_sec * 2)
+        logger.warning(
+            f"scheduler.lease_ttl ({settings.lease_ttl}s) isn't longer than "
+            f"the scheduler timeout ({timeout_sec}s), using {lease_ttl}s"
+        )
+    replica_id = create_replica_id()
+    match settings.coordination:
+        case CoordinationMode.LEADER:
+            return LeaderLease(
+                redis, settings.lease_key, lease_ttl, replica_id
+            )
+        case CoordinationMode.SHARDED:
+            return ShardedCoordination(
+                redis, settings.shard_key, lease_ttl, replica_id
+            )
+        case _:
+            return NoCoordination()
@@ -1,51 +1,85 @@
 import logging
 import random
+from datetime import datetime, timedelta
+from typing import Any, Final
 from uuid import UUID
 
 import httpx
 from context import ctx
 from fastapi import HTTPException
+from metrics import track_stage
+from pydantic import TypeAdapter
 
 from shared.entities import Config, Source, Story, StorySource
 
 logger = logging.getLogger("supervisor")
 
+SUMMARY_TABLE: Final[str] = "summary"
+STORY_SOURCES_VIEW: Final[str] = "story_sources"
 
-async def save_category_to_db(
-    request_id: UUID,
-    category_id: UUID,
-    entries: list[tuple[UUID, list[Source]]],
-):
-    story_uuids = list(map(lambda x: x[0], entries))
-    story_entities = list(
-        map(
-            lambda story_id: Story(
-                story_id=story_id,
-                request_id=request_id,
-                category_id=category_id,
-            ),
-            story_uuids,
+
+class FetchBatch:
+    """Story rows produced by a single fetch.
+
+    Rows are collected while categories are finalized and written by
+    `save_batch_to_db` in one transaction.
+    """
+
+    def __init__(self, request_id: UUID):
+        self.request_id = request_id
+        self.stories: list[Story] = []
+        self.story_sources: list[StorySource] = []
+
+    def add_category(
+        self,
+        category_id: UUID,
+        entries: list[tuple[UUID, list[Source]]],
+    ) -> None:
+        self.stories.extend(
+            map(
+                lambda x: Story(
+                    story_id=x[0],
+                    request_id=self.request_id,
+                    category_id=category_id,
+                ),
+                entries,
+            )
         )
-    )
-    await ctx.story_repo.add(story_entities)
-
-
-async def save_stories_to_db(story_id: UUID, entries: list[Source]) -> None:
-    entities = list(
-        map(
-            lambda x: StorySource(
-                story_id=story_id,
-                source_id=x.source_id,
-                channel_id=x.channel_id,
-            ),
-            entries,
+
+    def add_story(self, story_id: UUID, entries: list[Source]) -> None:
+        self.story_sources.extend(
+            map(
+                lambda x: StorySource(
+                    story_id=story_id,
+                    source_id=x.source_id,
+                    channel_id=x.channel_id,
+                ),
+                entries,
+            )
         )
+
+    def __len__(self) -> int:
+        return len(self.stories) + len(self.story_sources)
+
+
+async def save_batch_to_db(batch: FetchBatch) -> tuple[int, timedelta]:
+    time = datetime.now()
+    with track_stage("db_persist", size=len(batch)):
+        async with ctx.pg.transaction():
+            if batch.stories:
+                await ctx.story_repo.add(batch.stories)
+            if batch.story_sources:
+                await ctx.ss_repo.add(batch.story_sources)
+    elapsed = datetime.now() - time
+    logger.info(
+        f"Saved {len(batch.stories)} stories and {len(batch.story_sources)} "
+        f"story sources to the database. Time elapsed: {elapsed}"
     )
-    await ctx.ss_repo.add(entities)
+    return len(batch), elapsed
 
 
 async def retrieve_config(config_id) -> Config:
-    configs: list[Config] = await ctx.config_repo.get()
+    configs: list[Config] = await ctx.entity_cache.get_configs()
     configs = list(filter(lambda config: not config.inactive, configs))
     if not config_id:
         config = random.choice(configs)
@@ -63,3 +97,24 @@ async def retrieve_config(config_id) -> Config:
         logger.debug("Using requested config ID: {config.config_id}")
 
     return config
+
+
+async def select_by_ids(
+    table: str, entity: type, field: str, ids: list[Any]
+) -> dict[Any, list]:
+    """Load rows of `table` whose `field` is any of `ids` in one query.
+
+    Rows are grouped by ID, IDs without rows are mapped to an empty list.
+    """
+    grouped: dict[Any, list] = {value: [] for value in ids}
+    if not grouped:
+        return grouped
+    rows = await ctx.pg.fetch_all(
+        f"SELECT * FROM {table} WHERE {field} = ANY(:ids)",
+        {"ids": list(grouped)},
+    )
+    for row in TypeAdapter(list[entity]).validate_python(
+        [dict(row._mapping) for row in rows]
+    ):
+        grouped[getattr(row, field)].append(row)
+    return grouped
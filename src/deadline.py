@@ -0,0 +1,71 @@
+import time
+from contextvars import ContextVar
+
+from utils import REQUEST_TIMEOUT
+
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def set_deadline(budget_ms: int | None, default_budget_sec: float) -> None:
+    """Set deadline of the current request.
+
+    The budget given by the client takes precedence over the default one.
+    Non-positive default budget means there is no deadline.
+    """
+    if budget_ms is not None:
+        budget_sec = budget_ms / 1000
+    elif default_budget_sec > 0:
+        budget_sec = default_budget_sec
+    else:
+        _deadline.set(None)
+        return
+    _deadline.set(time.monotonic() + budget_sec)
+
+
+def current_deadline() -> float | None:
+    return _deadline.get()
+
+
+def extend_deadline(deadline: float | None) -> None:
+    """Move deadline of the current context to `deadline` if it's later.
+
+    `None` means there is no deadline, so it lifts the current one. Waits
+    and timeouts already derived from the deadline aren't affected.
+    """
+    current = _deadline.get()
+    if current is not None and (deadline is None or deadline > current):
+        _deadline.set(deadline)
+
+
+def remaining() -> float | None:
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def expired() -> bool:
+    budget = remaining()
+    return budget is not None and budget <= 0
+
+
+def get_timeout() -> float:
+    budget = remaining()
+    if budget is None:
+        return REQUEST_TIMEOUT
+    if budget <= 0:
+        raise DeadlineExceeded()
+    return budget
+
+
+def get_deadline_headers() -> dict[str, str]:
+    budget = remaining()
+    if budget is None:
+        return {}
+    return {DEADLINE_HEADER: str(max(int(budget * 1000), 0))}
@@ -0,0 +1,160 @@
+import logging
+from typing import Final
+
+from config import DispatchMode, SchedulerSettings
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import ResponseError
+
+logger = logging.getLogger("supervisor")
+
+
+class PubSubDispatcher:
+    """Publishes scheduled presets to a Redis pub/sub channel.
+
+    Messages are lost if nobody is subscribed, so dispatching is postponed
+    until there is at least one subscriber.
+    """
+
+    def __init__(self, redis: Redis, channel: str):
+        self.redis = redis
+        self.name = channel
+
+    async def ready(self) -> bool:
+        [(_, sub_num)] = await self.redis.pubsub_numsub(self.name)
+        if sub_num < 1:
+            logger.warn(
+                f'Seems like no one is subscribed to the Redis channel "{self.name}". '
+                + "Scheduler will do nothing and skip an iteration."
+            )
+            return False
+        return True
+
+    def add(self, pipe: Pipeline, data: str) -> None:
+        pipe.publish(self.name, data)
+
+
+class StreamDispatcher:
+    """Appends scheduled presets to a Redis stream read by a consumer group.
+
+    Entries stay in the stream until consumers acknowledge them, so nothing
+    is lost while consumers are busy or restarting.
+    """
+
+    def __init__(self, redis: Redis, stream: str, group: str, max_len: int):
+        self.redis = redis
+        self.name = stream
+        self.group = group
+        self.max_len = max_len
+        self.group_created = False
+
+    async def ready(self) -> bool:
+        if not self.group_created:
+            await create_group(self.redis, self.name, self.group)
+            self.group_created = True
+        return True
+
+    def add(self, pipe: Pipeline, data: str) -> None:
+        pipe.xadd(
+            self.name,
+            {StreamConsumer.DATA_FIELD: data},
+            maxlen=self.max_len,
+            approximate=True,
+        )
+
+
+async def create_group(redis: Redis, stream: str, group: str) -> None:
+    try:
+        await redis.xgroup_create(stream, group, id="0", mkstream=True)
+        logger.info(f'Created consumer group "{group}" for stream "{stream}"')
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+class StreamConsumer:
+    """Reads scheduled presets from the stream as a consumer group member.
+
+    Meant for digest consumers: every `read` first claims entries that other
+    consumers left unacknowledged for longer than `claim_idle_ms` and then
+    reads new ones. Entries must be acknowledged with `ack` once handled.
+    """
+
+    DATA_FIELD: Final[str] = "data"
+
+    def __init__(
+        self,
+        redis: Redis,
+        stream: str,
+        group: str,
+        consumer: str,
+        claim_idle_ms: int = 60000,
+        count: int = 10,
+        block_ms: int = 5000,
+    ):
+        self.redis = redis
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer
+        self.claim_idle_ms = claim_idle_ms
+        self.count = count
+        self.block_ms = block_ms
+
+    async def read(self) -> list[tuple[str, str]]:
+        _, claimed, *_ = await self.redis.xautoclaim(
+            self.stream,
+            self.group,
+            self.consumer,
+            min_idle_time=self.claim_idle_ms,
+            start_id="0-0",
+            count=self.count,
+        )
+        if claimed:
+            logger.debug(f"Claimed {len(claimed)} pending stream entries")
+            return self._unpack(claimed)
+
+        response = await self.redis.xreadgroup(
+            self.group,
+            self.consumer,
+            {self.stream: ">"},
+            count=self.count,
+            block=self.block_ms,
+        )
+        if not response:
+            return []
+        [(_, entries)] = response
+        return self._unpack(entries)
+
+    async def ack(self, *entry_ids: str) -> None:
+        await self.redis.xack(self.stream, self.group, *entry_ids)
+
+    def _unpack(self, entries) -> list[tuple[str, str]]:
+        result = []
+        for entry_id, fields in entries:
+            if not fields:
+                # NOTE: Entry was trimmed from the stream, nothing to handle
+                continue
+            data = fields.get(self.DATA_FIELD) or fields.get(
+                self.DATA_FIELD.encode()
+            )
+            result.append((_decode(entry_id), _decode(data)))
+        return result
+
+
+def _decode(value: str | bytes) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def create_dispatcher(
+    redis: Redis, settings: SchedulerSettings, channel: str
+) -> PubSubDispatcher | StreamDispatcher:
+    match settings.dispatch:
+        case DispatchMode.STREAM:
+            return StreamDispatcher(
+                redis,
+                settings.stream_name,
+                settings.stream_group,
+                settings.stream_max_len,
+            )
+        case _:
+            return PubSubDispatcher(redis, channel)
@@ -41,3 +41,54 @@ async def supervisor_exception_handler(_: Request, exc: Exception):
         },
         headers={"X-Request-ID": correlation_id.get() or ""},
     )
+
+
+class OverloadException(Exception):
+    def __init__(self, component: str, retry_after: int):
+        self.component = component
+        self.retry_after = retry_after
+
+
+async def overload_exception_handler(_: Request, exc: OverloadException):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "component": exc.component,
+            "component_status_code": None,
+            "component_error": "Too many pending requests, try again later",
+        },
+        headers={
+            "X-Request-ID": correlation_id.get() or "",
+            "Retry-After": str(exc.retry_after),
+        },
+    )
+
+
+async def deadline_exception_handler(_: Request, exc: Exception):
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={
+            "component": "SUPERVISOR",
+            "component_status_code": None,
+            "component_error": "Request deadline exceeded",
+        },
+        headers={"X-Request-ID": correlation_id.get() or ""},
+    )
+
+
+class FetchCancelled(Exception):
+    def __init__(self, fetch_id):
+        self.fetch_id = fetch_id
+
+
+async def fetch_cancelled_exception_handler(_: Request, exc: FetchCancelled):
+    # NOTE: 499 is the de facto status of requests closed by the client
+    return JSONResponse(
+        status_code=499,
+        content={
+            "component": "SUPERVISOR",
+            "component_status_code": None,
+            "component_error": "Fetch was cancelled",
+        },
+        headers={"X-Request-ID": correlation_id.get() or ""},
+    )
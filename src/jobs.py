@@ -0,0 +1,169 @@
+import asyncio
+import json
+import logging
+from datetime import datetime
+from enum import Enum
+from typing import Any, Awaitable, Callable
+from uuid import UUID, uuid4
+
+from asgi_correlation_id import correlation_id
+from exceptions import FetchCancelled, OverloadException
+
+from config import FetchJobSettings
+from redis.asyncio import Redis
+from shared.models import FetchRequest
+
+logger = logging.getLogger("supervisor")
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class FetchJobPool:
+    """Bounded pool of background workers running fetch jobs.
+
+    Jobs wait in a bounded in-process queue, so submitting fails fast when
+    the supervisor is saturated. Job state and results are kept in Redis,
+    which makes them visible to every replica.
+    """
+
+    KEY_PREFIX = "fetch-job:"
+    # NOTE: Saves the new state only if the stored one still has the
+    # expected status, so that concurrent transitions can't overwrite it
+    TRANSITION_SCRIPT = """
+    local state = redis.call("get", KEYS[1])
+    if not state or cjson.decode(state)["status"] ~= ARGV[1] then
+        return 0
+    end
+    redis.call("set", KEYS[1], ARGV[2], "EX", ARGV[3])
+    return 1
+    """
+
+    def __init__(self, redis: Redis, settings: FetchJobSettings):
+        self.redis = redis
+        self.settings = settings
+        self.queue: asyncio.Queue = asyncio.Queue(settings.queue_size)
+        self.workers: list[asyncio.Task] = []
+
+    def start(
+        self, handler: Callable[[UUID, FetchRequest], Awaitable[Any]]
+    ) -> None:
+        loop = asyncio.get_event_loop()
+        self.workers = [
+            loop.create_task(self._work(handler), name=f"Fetch Worker {i}")
+            for i in range(self.settings.workers)
+        ]
+        logger.info(f"Started {len(self.workers)} fetch job workers")
+
+    async def stop(self) -> None:
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        logger.info("Stopped fetch job workers")
+
+    def _dump(self, job_id: UUID, status: JobStatus, **fields) -> str:
+        return json.dumps(
+            {
+                "job_id": str(job_id),
+                "status": status,
+                "updated_at": datetime.now().isoformat(),
+                **fields,
+            }
+        )
+
+    async def _save(self, job_id: UUID, status: JobStatus, **fields) -> None:
+        await self.redis.set(
+            self.KEY_PREFIX + str(job_id),
+            self._dump(job_id, status, **fields),
+            ex=self.settings.ttl,
+        )
+
+    async def _transition(
+        self, job_id: UUID, expected: JobStatus, status: JobStatus
+    ) -> bool:
+        return bool(
+            await self.redis.eval(
+                self.TRANSITION_SCRIPT,
+                1,
+                self.KEY_PREFIX + str(job_id),
+                expected.value,
+                self._dump(job_id, status),
+                self.settings.ttl,
+            )
+        )
+
+    async def submit(self, request: FetchRequest) -> UUID:
+        if self.queue.full():
+            raise OverloadException("SUPERVISOR", self.settings.retry_after)
+
+        # NOTE: The state is saved first, workers only start queued jobs
+        job_id = uuid4()
+        await self._save(job_id, JobStatus.QUEUED)
+        try:
+            self.queue.put_nowait((job_id, request))
+        except asyncio.QueueFull:
+            await self.redis.delete(self.KEY_PREFIX + str(job_id))
+            raise OverloadException(
+                "SUPERVISOR", self.settings.retry_after
+            ) from None
+        logger.info(f"Submitted fetch job {job_id}")
+        return job_id
+
+    async def get(self, job_id: UUID) -> dict | None:
+        state = await self.redis.get(self.KEY_PREFIX + str(job_id))
+        return json.loads(state) if state is not None else None
+
+    async def wait(self, job_id: UUID, timeout: float) -> dict | None:
+        deadline = asyncio.get_event_loop().time() + timeout
+        while True:
+            state = await self.get(job_id)
+            if state is None or state["status"] in (
+                JobStatus.COMPLETED,
+                JobStatus.FAILED,
+                JobStatus.CANCELLED,
+            ):
+                return state
+            remaining = deadline - asyncio.get_event_loop().time()
+            if remaining <= 0:
+                return state
+            await asyncio.sleep(min(self.settings.poll_interval, remaining))
+
+    async def cancel(self, job_id: UUID) -> bool:
+        """Mark a queued job as cancelled, so that workers skip it."""
+        if not await self._transition(
+            job_id, JobStatus.QUEUED, JobStatus.CANCELLED
+        ):
+            return False
+        logger.info(f"Cancelled queued fetch job {job_id}")
+        return True
+
+    async def _work(self, handler) -> None:
+        while True:
+            job_id, request = await self.queue.get()
+            correlation_id.set(str(job_id))
+            try:
+                if not await self._transition(
+                    job_id, JobStatus.QUEUED, JobStatus.RUNNING
+                ):
+                    continue
+                result = await handler(job_id, request)
+                await self._save(job_id, JobStatus.COMPLETED, result=result)
+                logger.info(f"Finished fetch job {job_id}")
+            except asyncio.CancelledError:
+                raise
+            except FetchCancelled:
+                await self._save(job_id, JobStatus.CANCELLED)
+            except Exception as e:
+                logger.error(f"Fetch job {job_id} failed:\n{e}")
+                try:
+                    await self._save(job_id, JobStatus.FAILED, error=repr(e))
+                except Exception as e:
+                    logger.error(f"Failed to save fetch job state:\n{e}")
+            finally:
+                self.queue.task_done()
@@ -1,66 +1,78 @@
 import asyncio
 import logging
-from asyncio import Queue
 from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Any
-from uuid import UUID, uuid4
+from uuid import UUID
 
 import api.routes.callback as callback_routes
 import api.routes.config as config_routes
 import api.routes.dashboard as dashboard_routes
 import api.routes.feedback as feedback_routes
+import api.routes.fetch as fetch_routes
+import api.routes.job as job_routes
+import api.routes.metrics as metrics_routes
 import api.routes.preset as preset_routes
 import api.routes.schedule as schedule_routes
 import api.routes.summary as summary_routes
 import api.routes.user as user_routes
-from api.requests import call_scraper, call_summarizer
+from api.requests import get_summary
 from asgi_correlation_id import CorrelationIdMiddleware, correlation_id
-from clustering import clusterize
-from context import ctx, network_settings
+from context import ctx, network_settings, supervisor_settings
+from deadline import DeadlineExceeded, set_deadline
 from exceptions import (
     ComponentException,
+    FetchCancelled,
+    OverloadException,
     component_exception_handler,
+    deadline_exception_handler,
+    fetch_cancelled_exception_handler,
+    overload_exception_handler,
     supervisor_exception_handler,
 )
-from fastapi import FastAPI, Response, status
+from fastapi import FastAPI, Header, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import TypeAdapter
-from workers import finalize_category_entries, process_categories
-
-from db import retrieve_config
-from shared.entities import (
-    Config,
-    Request,
-    StorySources,
-    Summary,
+from fastapi.responses import JSONResponse, StreamingResponse
+from metrics import requests_in_flight
+from models import BatchSummarizeRequest, PartialFetchResponse
+from pipeline import plan_fetch, run_fetch, run_fetch_job, stream_fetch
+from summarization import (
+    SummaryBatch,
+    load_stories,
+    save_summaries,
+    stream_summaries,
+    summarize_stories,
+    summarize_story,
 )
+from timeline import start_timeline
+
+from shared.entities import StorySources
 from shared.logger import configure_logging
 from shared.models import (
     CategoryTitleRequest,
     Density,
-    EmbeddingSource,
     FetchRequest,
-    FetchResponse,
-    ParseResponse,
     SummarizeRequest,
 )
 from shared.routes import (
     SupervisorRoutes,
 )
-from shared.utils import DB_DATE_FORMAT
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     configure_logging()
     await ctx.init_db()
+    await ctx.init_http()
+    await ctx.start_listeners()
+    ctx.fetch_jobs.start(run_fetch_job)
     await ctx.start_scheduler()
     yield
+    await ctx.stop_listeners()
+    await ctx.fetch_jobs.stop()
     shutdown_tasks = [
         ctx.stop_scheduler(),
         ctx.dispose_db(),
+        ctx.dispose_http(),
     ]
     logger.debug("Waiting for running tasks to stop")
     try:
@@ -83,6 +95,16 @@ app.include_router(summary_routes.router)
 app.include_router(user_routes.router)
 app.include_router(feedback_routes.router)
 app.include_router(schedule_routes.router)
+app.include_router(job_routes.router)
+app.include_router(fetch_routes.router)
+app.include_router(metrics_routes.router)
+
+
+@app.middleware("http")
+async def track_requests_in_flight(request: Request, call_next):
+    with requests_in_flight.track_inprogress():
+        return await call_next(request)
+
 
 app.add_middleware(CorrelationIdMiddleware, validator=None)
 
@@ -116,6 +138,9 @@ app.add_middleware(
 )
 
 app.add_exception_handler(ComponentException, component_exception_handler)
+app.add_exception_handler(OverloadException, overload_exception_handler)
+app.add_exception_handler(DeadlineExceeded, deadline_exception_handler)
+app.add_exception_handler(FetchCancelled, fetch_cancelled_exception_handler)
 app.add_exception_handler(Exception, supervisor_exception_handler)
 
 
@@ -129,143 +154,170 @@ async def hello():
 
 @app.post(
     SupervisorRoutes.FETCH,
-    response_model=FetchResponse,
+    response_model=PartialFetchResponse,
     responses={204: {"model": None}},
 )
-async def fetch(request: FetchRequest, response: Response):
+async def fetch(
+    request: FetchRequest,
+    response: Response,
+    http_request: Request,
+    x_request_deadline_ms: int | None = Header(default=None),
+):
     corr_id = UUID(correlation_id.get())
     time = datetime.now()
+    set_deadline(x_request_deadline_ms, supervisor_settings.deadlines.fetch)
+    start_timeline(corr_id)
     logger.info("Started fetching updates")
 
-    config = await retrieve_config(request.config_id)
-    response = await call_scraper(
-        corr_id, request, EmbeddingSource(config.embedding_source)
-    )
+    async def serve():
+        plan = await plan_fetch(corr_id, request)
 
-    if response == []:
-        return JSONResponse(
-            status_code=204, content={"message": "Nothing was found"}
-        )
+        if plan is None:
+            return JSONResponse(
+                status_code=204, content={"message": "Nothing was found"}
+            )
 
-    typed_body = TypeAdapter(ParseResponse).validate_python(response)
-    sources = typed_body.sources
-    skipped_channel_ids = typed_body.skipped_channel_ids
+        if not plan.categories:
+            response.status_code = status.HTTP_204_NO_CONTENT
+            return {"skipped_channel_ids": plan.skipped_channel_ids}
 
-    if skipped_channel_ids:
-        logger.debug(
-            f"A few channels were skipped by scraper: {skipped_channel_ids}"
-        )
+        fetch_response = await run_fetch(corr_id, request, plan, time)
 
-    if not sources:
-        response.status_code = status.HTTP_204_NO_CONTENT
-        return {"skipped_channel_ids": skipped_channel_ids}
+        logger.info("Sending response with fetched updates")
+        return fetch_response
 
-    categories = await clusterize(
-        corr_id, config.embedding_source, config.categorize_method, sources
-    )
-    index_map: dict[UUID, int] = {
-        uuid: i for i, (uuid, stories) in enumerate(categories) if stories
-    }
-    category_entries = [None] * len(index_map)
-    queue: Queue = Queue()
-
-    workers = [
-        process_categories(corr_id, config, categories, queue)
-        for _ in range(ctx.shared_settings.config.category_async_pool_size)
-    ]
-    workers.append(
-        finalize_category_entries(queue, category_entries, index_map)
-    )
-    await asyncio.gather(*workers)
+    return await ctx.fetches.run(corr_id, serve(), http_request)
 
-    elapsed = datetime.now() - time
-    logger.info(
-        f"Finished fetching updates, sending response. Time elapsed: {elapsed}"
-    )
-    request_entity = Request(
-        chat_id=request.chat_id,
-        request_id=corr_id,
-        request_type="fetch",
-        status="completed",
-        time_passed=elapsed,
-        config_id=config.config_id,
+
+@app.post(SupervisorRoutes.FETCH + "/stream")
+async def fetch_stream(
+    request: FetchRequest,
+    http_request: Request,
+    x_request_deadline_ms: int | None = Header(default=None),
+):
+    corr_id = UUID(correlation_id.get())
+    time = datetime.now()
+    set_deadline(x_request_deadline_ms, supervisor_settings.deadlines.fetch)
+    start_timeline(corr_id)
+    logger.info("Started streaming fetched updates")
+
+    plan = await ctx.fetches.run(
+        corr_id, plan_fetch(corr_id, request), http_request
     )
-    await ctx.request_repo.add(request_entity)
-
-    return TypeAdapter(FetchResponse).validate_python(
-        {
-            "config_id": config.config_id,
-            "categories": category_entries,
-            "skipped_channel_ids": skipped_channel_ids,
-        }
+
+    return StreamingResponse(
+        stream_fetch(corr_id, request, plan, time),
+        media_type="application/x-ndjson",
     )
 
 
 @app.post(SupervisorRoutes.SUMMARIZE)
-async def summarize(request: SummarizeRequest):
+async def summarize(
+    request: SummarizeRequest,
+    x_request_deadline_ms: int | None = Header(default=None),
+):
     corr_id = correlation_id.get()
+    set_deadline(
+        x_request_deadline_ms, supervisor_settings.deadlines.summarize
+    )
+    start_timeline(UUID(corr_id))
     logger.info("Started serving summary request")
-    request.required_density = request.required_density[::-1]
-    summary_id = uuid4()
-    config: Config = (
-        await ctx.config_repo.get("config_id", request.config_id)
-    )[0]
-    preset = (await ctx.preset_repo.get("preset_id", request.preset_id))[0]
+    config = await ctx.entity_cache.get_config(request.config_id)
+    preset = await ctx.entity_cache.get_preset(request.preset_id)
     sources: list[StorySources] = await ctx.ss_view.get(
         "story_id", request.story_id
     )
-    story = list(map(lambda x: x.text, sources))
-
-    response: dict[Any, Any] = {}
-    response["summary"] = {}
-    request.required_density.append(Density.TITLE)
-    for density in request.required_density:
-        logger.debug(f"Started generating {density.value} summary")
-        summary = await call_summarizer(
-            UUID(corr_id), story, config, density, preset
-        )
-        logger.debug(f"Finished generating {density.value} summary")
-        response["summary"][density] = summary
-
-    response["summary_id"] = summary_id
-
-    entities = []
-
-    for density in request.required_density:
-        if density == density.TITLE:
-            pass
-        summary_entity = Summary(
-            summary_id=summary_id,
-            chat_id=request.chat_id,
-            story_id=UUID(request.story_id),
-            summary=response["summary"][density]["edited"],
-            title=response["summary"][Density.TITLE]["edited"],
-            density=density,
-            config_id=request.config_id,
-            feedback=None,
-            date_created=datetime.now().strftime(DB_DATE_FORMAT),
-        )
-        entities.append(summary_entity)
 
-    await ctx.summary_repo.add(entities)
+    response, entities = await summarize_story(
+        UUID(corr_id),
+        request.chat_id,
+        UUID(request.story_id),
+        sources,
+        config,
+        preset,
+        request.required_density,
+    )
 
-    response["references"] = list(map(lambda x: x.reference, sources))
+    await save_summaries(entities)
+    await ctx.timelines.save()
 
     logger.info("Sending response with summarized news")
     return response
 
 
+@app.post(SupervisorRoutes.SUMMARIZE + "/batch")
+async def summarize_batch(
+    request: BatchSummarizeRequest,
+    x_request_deadline_ms: int | None = Header(default=None),
+):
+    corr_id = correlation_id.get()
+    set_deadline(
+        x_request_deadline_ms, supervisor_settings.deadlines.summarize
+    )
+    start_timeline(UUID(corr_id))
+    logger.info(f"Started summarizing {len(request.story_ids)} stories")
+    config = await ctx.entity_cache.get_config(request.config_id)
+    preset = await ctx.entity_cache.get_preset(request.preset_id)
+    stories = await load_stories(request.story_ids)
+
+    batch = SummaryBatch(request.story_ids, stories)
+    async for _ in summarize_stories(
+        UUID(corr_id),
+        request.chat_id,
+        stories,
+        config,
+        preset,
+        request.required_density,
+        batch,
+    ):
+        pass
+
+    await save_summaries(batch.entities)
+    await ctx.timelines.save()
+
+    logger.info("Sending response with summarized stories")
+    return {"summaries": batch.summaries, **batch.dump()}
+
+
+@app.post(SupervisorRoutes.SUMMARIZE + "/batch/stream")
+async def summarize_batch_stream(
+    request: BatchSummarizeRequest,
+    x_request_deadline_ms: int | None = Header(default=None),
+):
+    corr_id = correlation_id.get()
+    set_deadline(
+        x_request_deadline_ms, supervisor_settings.deadlines.summarize
+    )
+    start_timeline(UUID(corr_id))
+    logger.info(
+        f"Started streaming summaries of {len(request.story_ids)} stories"
+    )
+    config = await ctx.entity_cache.get_config(request.config_id)
+    preset = await ctx.entity_cache.get_preset(request.preset_id)
+    stories = await load_stories(request.story_ids)
+
+    return StreamingResponse(
+        stream_summaries(UUID(corr_id), request, stories, config, preset),
+        media_type="application/x-ndjson",
+    )
+
+
 @app.post(SupervisorRoutes.CATEGORY_TITLE)
-async def get_category_title(request: CategoryTitleRequest):
+async def get_category_title(
+    request: CategoryTitleRequest,
+    x_request_deadline_ms: int | None = Header(default=None),
+):
     corr_id = correlation_id.get()
+    set_deadline(
+        x_request_deadline_ms, supervisor_settings.deadlines.summarize
+    )
+    start_timeline(UUID(corr_id))
     logger.info("Started serving category title request")
-    config: Config = (
-        await ctx.config_repo.get("config_id", request.config_id)
-    )[0]
-    preset = (await ctx.preset_repo.get("preset_id", request.preset_id))[0]
+    config = await ctx.entity_cache.get_config(request.config_id)
+    preset = await ctx.entity_cache.get_preset(request.preset_id)
 
     logger.debug("Started generating title for category")
-    title = await call_summarizer(
+    title = await get_summary(
         UUID(corr_id),
         request.texts,
         config,
@@ -274,6 +326,7 @@ async def get_category_title(request: CategoryTitleRequest):
         edit=False,
     )
     response = {"title": title}
+    await ctx.timelines.save()
 
     logger.info("Sending response with category title")
     return response
@@ -0,0 +1,86 @@
+from contextlib import contextmanager
+from uuid import UUID
+
+from prometheus_client import Counter, Gauge, Histogram
+from timeline import Span, current_timeline
+
+STAGE_BUCKETS = (
+    0.01,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+)
+
+stage_duration = Histogram(
+    "supervisor_stage_duration_seconds",
+    "Duration of fetch and summarize pipeline stages",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+stage_errors = Counter(
+    "supervisor_stage_errors_total",
+    "Pipeline stages which finished with an error",
+    ["stage"],
+)
+requests_in_flight = Gauge(
+    "supervisor_requests_in_flight",
+    "HTTP requests being handled by the supervisor",
+)
+category_backlog = Gauge(
+    "supervisor_category_backlog",
+    "Categories of running fetches waiting for a linking worker",
+)
+scheduler_iteration = Gauge(
+    "supervisor_scheduler_iteration_seconds",
+    "Duration of the last scheduler iteration",
+)
+
+_category_backlogs: dict[int, list[tuple[UUID, list]]] = {}
+category_backlog.set_function(
+    lambda: sum(
+        sum(1 for _, sources in categories if sources)
+        for categories in list(_category_backlogs.values())
+    )
+)
+
+
+def register_category_backlog(categories: list[tuple[UUID, list]]) -> None:
+    """Count categories not yet taken by linking workers in the gauge.
+
+    Workers pop categories from the list, so only the rest is counted.
+    """
+    _category_backlogs[id(categories)] = categories
+
+
+def unregister_category_backlog(categories: list[tuple[UUID, list]]) -> None:
+    _category_backlogs.pop(id(categories), None)
+
+
+@contextmanager
+def track_stage(stage: str, size: int | None = None):
+    """Measure a stage and add it to the timeline of the current request.
+
+    The yielded span's `size` may be set inside the block once the size of
+    the stage output is known.
+    """
+    span = Span(stage, size)
+    try:
+        yield span
+    except Exception:
+        stage_errors.labels(stage).inc()
+        raise
+    finally:
+        span.finish()
+        stage_duration.labels(stage).observe(span.duration)
+        timeline = current_timeline()
+        if timeline is not None:
+            timeline.add(span)
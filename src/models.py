@@ -0,0 +1,17 @@
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from shared.models import Density, FetchResponse
+
+
+class PartialFetchResponse(FetchResponse):
+    skipped_category_ids: list[UUID] = []
+
+
+class BatchSummarizeRequest(BaseModel):
+    chat_id: int
+    config_id: int
+    preset_id: UUID
+    story_ids: list[UUID]
+    required_density: list[Density]
@@ -0,0 +1,297 @@
+import asyncio
+import json
+import logging
+from asyncio import Queue
+from datetime import datetime
+from uuid import UUID
+
+from api.requests import call_scraper
+from clustering import clusterize
+from context import ctx, supervisor_settings
+from deadline import DeadlineExceeded, remaining, set_deadline
+from metrics import (
+    register_category_backlog,
+    stage_duration,
+    track_stage,
+    unregister_category_backlog,
+)
+from models import PartialFetchResponse
+from pydantic import TypeAdapter
+from timeline import start_timeline
+from workers import (
+    finalize_category,
+    finalize_category_entries,
+    process_categories,
+)
+
+from db import FetchBatch, retrieve_config, save_batch_to_db
+from shared.entities import Config, Request, Source
+from shared.models import (
+    EmbeddingSource,
+    FetchRequest,
+    ParseResponse,
+)
+
+logger = logging.getLogger("supervisor")
+
+
+class FetchPlan:
+    """Categorized sources of a fetch, ready to be linked into stories."""
+
+    def __init__(
+        self,
+        config: Config,
+        categories: list[tuple[UUID, list[Source]]],
+        skipped_channel_ids: list[int],
+    ):
+        self.config = config
+        self.categories = categories
+        self.skipped_channel_ids = skipped_channel_ids
+        self.index_map: dict[UUID, int] = {
+            uuid: i for i, (uuid, stories) in enumerate(categories) if stories
+        }
+
+
+async def plan_fetch(corr_id: UUID, request: FetchRequest) -> FetchPlan | None:
+    config = await retrieve_config(request.config_id)
+    response = await call_scraper(
+        corr_id, request, EmbeddingSource(config.embedding_source)
+    )
+
+    if response == []:
+        return None
+
+    typed_body = TypeAdapter(ParseResponse).validate_python(response)
+    sources = typed_body.sources
+    skipped_channel_ids = typed_body.skipped_channel_ids
+
+    if skipped_channel_ids:
+        logger.debug(
+            f"A few channels were skipped by scraper: {skipped_channel_ids}"
+        )
+
+    if not sources:
+        return FetchPlan(config, [], skipped_channel_ids)
+
+    with track_stage("categorize", size=len(sources)):
+        categories = await clusterize(
+            corr_id,
+            config.embedding_source,
+            config.categorize_method,
+            sources,
+        )
+    return FetchPlan(config, categories, skipped_channel_ids)
+
+
+def link_categories(corr_id: UUID, plan: FetchPlan, queue: Queue):
+    return [
+        process_categories(corr_id, plan.config, plan.categories, queue)
+        for _ in range(ctx.shared_settings.config.category_async_pool_size)
+    ]
+
+
+async def save_request(
+    request: FetchRequest, corr_id: UUID, config: Config, time: datetime
+) -> None:
+    elapsed = datetime.now() - time
+    stage_duration.labels("fetch").observe(elapsed.total_seconds())
+    logger.info(f"Finished fetching updates. Time elapsed: {elapsed}")
+    request_entity = Request(
+        chat_id=request.chat_id,
+        request_id=corr_id,
+        request_type="fetch",
+        status="completed",
+        time_passed=elapsed,
+        config_id=config.config_id,
+    )
+    await ctx.request_repo.add(request_entity)
+    await ctx.timelines.save()
+
+
+async def run_fetch(
+    corr_id: UUID,
+    request: FetchRequest,
+    plan: FetchPlan,
+    time: datetime,
+) -> PartialFetchResponse:
+    """Link categories into stories and save them.
+
+    If the request deadline is exceeded while linking, categories finalized
+    by that moment are saved and returned, the rest are reported as skipped.
+    """
+    category_entries = [None] * len(plan.index_map)
+    queue = Queue()
+
+    workers = link_categories(corr_id, plan, queue)
+    batch = FetchBatch(corr_id)
+    workers.append(
+        finalize_category_entries(
+            queue, category_entries, plan.index_map, batch
+        )
+    )
+    tasks = list(map(asyncio.ensure_future, workers))
+    pending = set(tasks)
+    register_category_backlog(plan.categories)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=remaining(),
+                return_when=asyncio.FIRST_EXCEPTION,
+            )
+            if not done:
+                break
+            # NOTE: Any other failure aborts the fetch right away, categories
+            # of a failed worker would never reach the finalizer
+            for task in done:
+                exc = task.exception()
+                if exc is not None and not isinstance(exc, DeadlineExceeded):
+                    raise exc
+    finally:
+        unregister_category_backlog(plan.categories)
+        for task in tasks:
+            task.cancel()
+
+    skipped_category_ids = [
+        category_id
+        for category_id, i in plan.index_map.items()
+        if category_entries[i] is None
+    ]
+    if skipped_category_ids:
+        logger.warning(
+            f"Request deadline exceeded, skipped "
+            f"{len(skipped_category_ids)} categories"
+        )
+
+    await save_batch_to_db(batch)
+    await save_request(request, corr_id, plan.config, time)
+
+    return TypeAdapter(PartialFetchResponse).validate_python(
+        {
+            "config_id": plan.config.config_id,
+            "categories": [e for e in category_entries if e is not None],
+            "skipped_channel_ids": plan.skipped_channel_ids,
+            "skipped_category_ids": skipped_category_ids,
+        }
+    )
+
+
+async def run_fetch_job(job_id: UUID, request: FetchRequest) -> dict:
+    set_deadline(None, supervisor_settings.deadlines.fetch)
+    start_timeline(job_id)
+    return await ctx.fetches.run(job_id, _fetch_job(job_id, request))
+
+
+async def _fetch_job(job_id: UUID, request: FetchRequest) -> dict:
+    time = datetime.now()
+    logger.info("Started fetching updates in background job")
+
+    plan = await plan_fetch(job_id, request)
+
+    if plan is None:
+        return {"message": "Nothing was found"}
+
+    if not plan.categories:
+        return {"skipped_channel_ids": plan.skipped_channel_ids}
+
+    fetch_response = await run_fetch(job_id, request, plan, time)
+    return fetch_response.model_dump(mode="json")
+
+
+def dump_line(data: dict) -> str:
+    return json.dumps(data, default=str) + "\n"
+
+
+async def stream_fetch(
+    corr_id: UUID,
+    request: FetchRequest,
+    plan: FetchPlan | None,
+    time: datetime,
+):
+    """Yield NDJSON lines with categories as soon as they are finalized.
+
+    Stories of every category are saved before the category is sent, so
+    the client may request their summaries right away. The last line
+    carries skipped channel IDs and categories skipped because the request
+    deadline was exceeded or the fetch was cancelled.
+    """
+    pending_ids: set[UUID] = set()
+    cancelled = False
+    if plan is not None and plan.index_map:
+        queue = Queue()
+        tasks = list(
+            map(asyncio.ensure_future, link_categories(corr_id, plan, queue))
+        )
+        ctx.fetches.register(str(corr_id), tasks)
+        register_category_backlog(plan.categories)
+        pending_ids.update(plan.index_map)
+        try:
+            while pending_ids:
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait(
+                    [getter, *(task for task in tasks if not task.done())],
+                    timeout=remaining(),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not getter.done():
+                    getter.cancel()
+                    failed = [
+                        task
+                        for task in tasks
+                        if task.done()
+                        and (task.cancelled() or task.exception() is not None)
+                    ]
+                    if any(task.cancelled() for task in failed):
+                        logger.warning(
+                            f"Fetch was cancelled, skipped "
+                            f"{len(pending_ids)} categories"
+                        )
+                        cancelled = True
+                        break
+                    for task in failed:
+                        if not isinstance(task.exception(), DeadlineExceeded):
+                            raise task.exception()
+                    # NOTE: A worker finished, the rest are still linking
+                    if done and not failed:
+                        continue
+                    logger.warning(
+                        f"Request deadline exceeded, skipped "
+                        f"{len(pending_ids)} categories"
+                    )
+                    break
+
+                _, category_id, stories = await getter
+                pending_ids.discard(category_id)
+                batch = FetchBatch(corr_id)
+                entry = finalize_category(category_id, stories, batch)
+                await save_batch_to_db(batch)
+                yield dump_line(
+                    {
+                        "type": "category",
+                        "index": plan.index_map[category_id],
+                        "category": entry.model_dump(mode="json"),
+                    }
+                )
+            if not pending_ids:
+                await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            ctx.fetches.unregister(str(corr_id), tasks)
+            unregister_category_backlog(plan.categories)
+        if not cancelled:
+            await save_request(request, corr_id, plan.config, time)
+
+    yield dump_line(
+        {
+            "type": "done",
+            "config_id": plan.config.config_id if plan else None,
+            "skipped_channel_ids": plan.skipped_channel_ids if plan else [],
+            "skipped_category_ids": [
+                category_id
+                for category_id in (plan.index_map if plan else [])
+                if category_id in pending_ids
+            ],
+            "cancelled": cancelled,
+        }
+    )
@@ -0,0 +1,41 @@
+import asyncio
+import json
+import logging
+from typing import Any, Callable
+
+from redis.asyncio import Redis
+
+logger = logging.getLogger("supervisor")
+
+
+async def listen(
+    redis: Redis,
+    channel: str,
+    handler: Callable[[Any], None],
+    name: str,
+    on_reconnect: Callable[[], None] | None = None,
+    reconnect_sec: float = 1.0,
+) -> None:
+    """Pass every JSON message of a Redis channel to `handler`.
+
+    The subscription is re-established after failures, `on_reconnect` is
+    called before that since messages may have been missed meanwhile. Runs
+    until cancelled.
+    """
+    logger.info(f"Starting {name} listener")
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(channel)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    handler(json.loads(message["data"]))
+        except asyncio.CancelledError:
+            logger.debug(f"Stopping {name} listener")
+            break
+        except Exception as e:
+            logger.error(f"{name.capitalize()} listener failed:\n{e}")
+            if on_reconnect is not None:
+                on_reconnect()
+            await asyncio.sleep(reconnect_sec)
@@ -1,7 +1,8 @@
 import json
 import logging
-from functools import reduce
+from functools import lru_cache, reduce
 
+import numpy as np
 from rb_tocase import Case
 
 from shared.entities import Source
@@ -9,6 +10,15 @@ from shared.entities import Source
 logger = logging.getLogger("supervisor")
 
 
+@lru_cache(maxsize=65536)
+def count_reactions(reactions: str) -> int:
+    count = 0
+    for reaction_entry in json.loads(reactions):
+        count += reaction_entry["count"]
+
+    return count
+
+
 class AbstractScorer:
     def get_metrics(self, scores):
         return list(map(self.key, scores))
@@ -39,6 +49,9 @@ class SizeScorer(AbstractScorer):
     def __init__(self):
         self.key = lambda x: len(x[1][1])
 
+    def get_source_metric(self, entity: Source):
+        return 1
+
 
 class ReactionScorer(AbstractScorer):
     def __init__(self):
@@ -48,13 +61,10 @@ class ReactionScorer(AbstractScorer):
         if entity.reactions is None:
             return 0
 
-        reactions = json.loads(entity.reactions)
+        return count_reactions(entity.reactions)
 
-        count = 0
-        for reaction_entry in reactions:
-            count += reaction_entry["count"]
-
-        return count
+    def get_source_metric(self, entity: Source):
+        return self._get_reactions(entity)
 
     def _get_story_score(self, story_entry):
         return reduce(
@@ -69,6 +79,9 @@ class CommentScorer(AbstractScorer):
     def _get_comments(self, entity: Source):
         return len(entity.comments) if entity.comments else 0
 
+    def get_source_metric(self, entity: Source):
+        return self._get_comments(entity)
+
     def _get_story_score(self, story_entry):
         return reduce(
             lambda acc, y: acc + self._get_comments(y), story_entry, 0
@@ -82,6 +95,9 @@ class ViewScorer(AbstractScorer):
     def _get_story_score(self, story_entry):
         return reduce(lambda acc, y: acc + y.views, story_entry, 0)
 
+    def get_source_metric(self, entity: Source):
+        return entity.views
+
 
 class Ranker:
     def __init__(self, scorers):
@@ -126,5 +142,71 @@ class Ranker:
         return sorted_scores
 
 
+class VectorRanker(Ranker):
+    """Ranker computing metrics of all scorers at once with NumPy.
+
+    Per-source metrics are extracted into a single feature matrix, summed
+    over story boundaries and normalized in a vectorized way. The resulting
+    ordering is the same as the one produced by `Ranker`.
+    """
+
+    def _extract_features(self, sources, scorers) -> np.ndarray:
+        features = np.empty((len(scorers), len(sources)), dtype=np.float64)
+        for i, scorer in enumerate(scorers):
+            features[i] = np.fromiter(
+                map(scorer.get_source_metric, sources),
+                dtype=np.float64,
+                count=len(sources),
+            )
+        return features
+
+    def get_sorted(
+        self,
+        stories,
+        weights,
+        required_scorers=None,
+        return_scores=False,
+    ):
+        stories = list(stories)
+        if not stories:
+            return []
+
+        lengths = np.fromiter(
+            map(lambda x: len(x[1]), stories),
+            dtype=np.int64,
+            count=len(stories),
+        )
+        segment_ids = np.repeat(np.arange(len(stories)), lengths)
+        sources = [source for _, story in stories for source in story]
+
+        scorers = self._get_scorers(required_scorers)
+        features = self._extract_features(sources, scorers)
+
+        scores = np.zeros(len(stories), dtype=np.float64)
+        for scorer, feature in zip(scorers, features, strict=True):
+            metrics = np.bincount(
+                segment_ids, weights=feature, minlength=len(stories)
+            )
+            max_score = metrics.max()
+            if max_score == 0:
+                max_score = 1
+            scores = (metrics / max_score) * weights[
+                scorer.get_label()
+            ] + scores
+
+        order = np.argsort(-scores, kind="stable")
+
+        if logger.isEnabledFor(logging.DEBUG):
+            printable_scores = list(
+                map(lambda i: (float(scores[i]), stories[i][0]), order)
+            )
+            logger.debug(f"Ranking results: {printable_scores}")
+
+        if not return_scores:
+            return list(map(lambda i: stories[i], order))
+
+        return list(map(lambda i: (float(scores[i]), stories[i]), order))
+
+
 def init_scorers():
     return [scorer() for scorer in AbstractScorer.__subclasses__()]
@@ -1,33 +1,145 @@
 import asyncio
+import heapq
+import itertools
 import json
 import logging
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Final
+from uuid import UUID
 
+from coordination import NoCoordination
 from croniter import croniter
+from dispatch import PubSubDispatcher, StreamDispatcher
+from metrics import scheduler_iteration
+from pubsub import listen
 
 from redis.asyncio import Redis
-from shared.db import PgRepository
+from shared.db import Database, PgRepository
 from shared.entities import ScheduledPreset
 
 logger = logging.getLogger("supervisor")
 
 
+class ScheduleIndex:
+    """Priority queue of active schedules keyed by their next fire time.
+
+    Outdated heap items are not removed eagerly: every item carries the
+    version of the entry it was pushed for and is skipped when popped if a
+    newer version exists.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[datetime, int, UUID]] = []
+        self._entries: dict[UUID, ScheduledPreset] = {}
+        self._versions: dict[UUID, int] = {}
+        self._counter = itertools.count()
+
+    def _get_next_fire(self, entry: ScheduledPreset) -> datetime:
+        return croniter(entry.cron, entry.last_run).get_next(datetime)
+
+    def rebuild(self, entries: list[ScheduledPreset]) -> None:
+        self._heap.clear()
+        self._entries.clear()
+        self._versions.clear()
+        for entry in entries:
+            if entry.active and not entry.deleted:
+                version = next(self._counter)
+                self._entries[entry.schedule_id] = entry
+                self._versions[entry.schedule_id] = version
+                self._heap.append(
+                    (self._get_next_fire(entry), version, entry.schedule_id)
+                )
+        heapq.heapify(self._heap)
+
+    def put(self, entry: ScheduledPreset) -> None:
+        if not entry.active or entry.deleted:
+            self.remove(entry.schedule_id)
+            return
+
+        version = next(self._counter)
+        self._entries[entry.schedule_id] = entry
+        self._versions[entry.schedule_id] = version
+        heapq.heappush(
+            self._heap,
+            (self._get_next_fire(entry), version, entry.schedule_id),
+        )
+
+    def remove(self, schedule_id: UUID) -> None:
+        self._entries.pop(schedule_id, None)
+        self._versions.pop(schedule_id, None)
+
+    def _drop_outdated(self) -> None:
+        while self._heap:
+            _, version, schedule_id = self._heap[0]
+            if self._versions.get(schedule_id) == version:
+                break
+            heapq.heappop(self._heap)
+
+    def next_fire_time(self) -> datetime | None:
+        self._drop_outdated()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> list[ScheduledPreset]:
+        due = []
+        self._drop_outdated()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, schedule_id = heapq.heappop(self._heap)
+            self._versions.pop(schedule_id)
+            due.append(self._entries.pop(schedule_id))
+            self._drop_outdated()
+        return due
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 class Scheduler:
+    """Dispatches scheduled presets once their cron expression fires.
+
+    The index is built from the whole schedule table on startup and when
+    the owned schedules change. After that, only schedules recorded in the
+    Redis change log since the last sync are reloaded. Changes are also
+    broadcast, so that the replica owning a schedule picks them up on its
+    next iteration.
+    """
+
     CHANNEL_NAME: Final[str] = "scheduled"
+    CHANGES_CHANNEL_NAME: Final[str] = "schedule-changes"
+    SCHEDULE_TABLE: Final[str] = "schedule"
+    # NOTE: Covers clock skew between replicas and changes which were being
+    # recorded while the change log was read
+    CLOCK_SKEW_SEC: Final[float] = 5.0
 
     def __init__(
         self,
+        pg: Database,
         schedule_view: PgRepository,
         redis: Redis,
         timeout_sec: int,
         interval_sec: int,
+        resync_interval_sec: int,
+        changes_key: str,
+        change_log_ttl_sec: int,
+        batch_size: int,
+        coordinator: NoCoordination,
+        dispatcher: PubSubDispatcher | StreamDispatcher,
     ):
+        self.pg = pg
         self.schedule_view = schedule_view
         self.redis = redis
         self.timeout_sec = timeout_sec
         self.interval_sec = interval_sec
+        self.resync_interval_sec = resync_interval_sec
+        self.changes_key = changes_key
+        self.change_log_ttl_sec = change_log_ttl_sec
+        self.batch_size = batch_size
+        self.coordinator = coordinator
+        self.dispatcher = dispatcher
         self.prev_run = None
+        self.index = ScheduleIndex()
+        self.synced_at: float | None = None
+        self._pending: set[UUID] = set()
 
     def _prepare_schedule_data(self, entry: ScheduledPreset) -> str:
         data = entry.model_dump()
@@ -36,10 +148,146 @@ class Scheduler:
         data["last_run"] = data["last_run"].isoformat()
         return json.dumps(data)
 
+    def _is_index_outdated(self) -> bool:
+        return (
+            self.coordinator.changed
+            or self.synced_at is None
+            or self.synced_at + self.resync_interval_sec <= time.time()
+        )
+
+    async def resync(self) -> None:
+        now = time.time()
+        if (
+            self.coordinator.changed
+            or self.synced_at is None
+            or self.synced_at + self.change_log_ttl_sec <= now
+        ):
+            await self.rebuild()
+        else:
+            await self.pull_changes(self.synced_at - self.CLOCK_SKEW_SEC)
+        self.synced_at = now
+
+    async def rebuild(self) -> None:
+        self.coordinator.changed = False
+        records = await self.schedule_view.get()
+        self.index.rebuild(
+            [r for r in records if self.coordinator.owns(r.schedule_id)]
+        )
+        logger.debug(
+            f"Pulled {len(records)} scheduling records from the database, "
+            f"{len(self.index)} of them are active"
+        )
+
+    async def pull_changes(self, since: float) -> None:
+        changed = await self.redis.zrangebyscore(
+            self.changes_key, since, "+inf"
+        )
+        for schedule_id in changed:
+            if isinstance(schedule_id, bytes):
+                schedule_id = schedule_id.decode()
+            await self.refresh(UUID(schedule_id))
+        logger.debug(f"Pulled {len(changed)} changed scheduling records")
+
+    async def record_change(self, schedule_id: UUID) -> None:
+        """Apply a schedule change locally and log it for other replicas."""
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(self.changes_key, {str(schedule_id): now})
+            pipe.zremrangebyscore(
+                self.changes_key, "-inf", now - self.change_log_ttl_sec
+            )
+            pipe.publish(
+                self.CHANGES_CHANNEL_NAME,
+                json.dumps({"schedule_id": str(schedule_id)}),
+            )
+            await pipe.execute()
+        await self.refresh(schedule_id)
+
+    async def apply_pending(self) -> None:
+        pending, self._pending = self._pending, set()
+        for schedule_id in pending:
+            await self.refresh(schedule_id)
+
+    async def listen(self) -> None:
+        await listen(
+            self.redis,
+            self.CHANGES_CHANNEL_NAME,
+            lambda data: self._pending.add(UUID(data["schedule_id"])),
+            "schedule change",
+        )
+
+    async def refresh(self, schedule_id: UUID) -> None:
+        entries = await self.schedule_view.get("schedule_id", schedule_id)
+        if entries and self.coordinator.owns(schedule_id):
+            self.index.put(entries[0])
+        else:
+            self.index.remove(schedule_id)
+
+    async def _dispatch_batch(
+        self, entries: list[ScheduledPreset], tz: timezone
+    ) -> None:
+        time = datetime.now()
+        logger.debug(
+            f'Publishing {len(entries)} scheduling entries to "{self.dispatcher.name}"'
+        )
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for entry in entries:
+                self.dispatcher.add(pipe, self._prepare_schedule_data(entry))
+            await pipe.execute()
+
+        # NOTE: Entries are already published, so they must not fire again
+        # even if the database update below fails
+        last_run = datetime.now(tz)
+        for entry in entries:
+            entry.last_run = last_run
+        await self.pg.execute(
+            f"UPDATE {self.SCHEDULE_TABLE} SET last_run = :last_run "
+            "WHERE schedule_id = ANY(:schedule_ids)",
+            {
+                "last_run": last_run,
+                "schedule_ids": [entry.schedule_id for entry in entries],
+            },
+        )
+        logger.info(
+            f"Dispatched {len(entries)} scheduling entries. "
+            f"Time elapsed: {datetime.now() - time}"
+        )
+
+    async def _acquire(self) -> bool:
+        try:
+            return await self.coordinator.acquire()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to coordinate with other replicas:\n{e}")
+            return False
+
+    async def _verify(self) -> bool:
+        try:
+            return await self.coordinator.verify()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to verify scheduler ownership:\n{e}")
+            return False
+
+    async def _ready(self) -> bool:
+        try:
+            return await self.dispatcher.ready()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to prepare scheduler dispatch:\n{e}")
+            return False
+
     async def job(self):
         logger.info("Starting scheduler job")
         while True:
             try:
+                if not await self._acquire():
+                    await asyncio.sleep(self.timeout_sec)
+                    continue
+
                 if (
                     self.prev_run is not None
                     and self.prev_run + timedelta(seconds=self.interval_sec)
@@ -48,57 +296,60 @@ class Scheduler:
                     await asyncio.sleep(self.timeout_sec)
                     continue
 
-                [(_, sub_num)] = await self.redis.pubsub_numsub(
-                    self.CHANNEL_NAME
-                )
-                if sub_num < 1:
-                    logger.warn(
-                        f'Seems like no one is subscribed to the Redis channel "{self.CHANNEL_NAME}". '
-                        + "Scheduler will do nothing and skip an iteration."
-                    )
+                if not await self._ready():
                     await asyncio.sleep(self.timeout_sec)
                     continue
 
                 logger.debug("Starting new scheduler job iteration")
+                start = time.perf_counter()
                 try:
-                    records = await self.schedule_view.get()
-                    logger.debug(
-                        f"Pulled {len(records)} scheduling records from the database"
-                    )
-                    for entry in records:
-                        # TODO(vinc3nzo): user's timezone handling
-                        # See: https://github.com/kiltia/inbrief/issues/314
-                        td = timedelta(hours=0)
-                        tz = timezone(td)
-                        if (
-                            entry.active
-                            and not entry.deleted
-                            and croniter(entry.cron, entry.last_run).get_next(
-                                datetime
-                            )
-                            <= datetime.now(tz)
-                        ):
-                            data = self._prepare_schedule_data(entry)
-                            logger.debug(
-                                f'Publishing scheduling entry to the Redis channel "{self.CHANNEL_NAME}"'
-                            )
-                            await self.redis.publish(self.CHANNEL_NAME, data)
-                            logger.debug(
-                                f'Successfully published scheduling entry to the Redis channel "{self.CHANNEL_NAME}"'
+                    if self._is_index_outdated():
+                        await self.resync()
+                    await self.apply_pending()
+
+                    # TODO(vinc3nzo): user's timezone handling
+                    # See: https://github.com/kiltia/inbrief/issues/314
+                    td = timedelta(hours=0)
+                    tz = timezone(td)
+                    due = self.index.pop_due(datetime.now(tz))
+                    logger.debug(f"Found {len(due)} due scheduling entries")
+                    for i in range(0, len(due), self.batch_size):
+                        # NOTE: Ownership may have moved to another replica
+                        # since the lease was checked
+                        if not await self._verify():
+                            logger.warning(
+                                "Lost scheduler ownership, skipped "
+                                f"{len(due) - i} due scheduling entries"
                             )
-                            entry.last_run = datetime.now(tz)
-                            await self.schedule_view.update(
-                                entry, ["last_run"]
+                            for entry in due[i:]:
+                                self.index.put(entry)
+                            break
+                        batch = due[i : i + self.batch_size]
+                        try:
+                            await self._dispatch_batch(batch, tz)
+                        except asyncio.CancelledError:
+                            raise
+                        except Exception as e:
+                            logger.error(
+                                f"Failed to dispatch scheduling entries:\n{e}"
                             )
+                        finally:
+                            for entry in batch:
+                                self.index.put(entry)
                 except asyncio.CancelledError:
                     raise
                 except Exception as e:
                     logger.error(f"Unexpected error in scheduler:\n{e}")
                 self.prev_run = datetime.now()
+                scheduler_iteration.set(time.perf_counter() - start)
                 logger.debug("Finished scheduler job iteration")
             except asyncio.CancelledError:
                 logger.debug(
                     "Received cancel command in the scheduler, stopping"
                 )
                 break
+        try:
+            await self.coordinator.release()
+        except Exception as e:
+            logger.error(f"Failed to release scheduler coordination:\n{e}")
         logger.info("Stopped scheduler job")
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator
+from uuid import UUID, uuid4
+
+from api.requests import get_summary
+from context import ctx, supervisor_settings
+from deadline import DeadlineExceeded
+from exceptions import ComponentException, OverloadException
+from metrics import track_stage
+from models import BatchSummarizeRequest
+from pipeline import dump_line
+
+from db import STORY_SOURCES_VIEW, select_by_ids
+from shared.entities import Config, Preset, StorySources, Summary
+from shared.models import Density
+from shared.utils import DB_DATE_FORMAT
+
+logger = logging.getLogger("supervisor")
+
+
+async def generate_summary(
+    corr_id: UUID,
+    story: list[str],
+    config: Config,
+    density: Density,
+    preset: Preset,
+):
+    logger.debug(f"Started generating {density.value} summary")
+    summary = await get_summary(corr_id, story, config, density, preset)
+    logger.debug(f"Finished generating {density.value} summary")
+    return summary
+
+
+async def summarize_story(
+    corr_id: UUID,
+    chat_id: int,
+    story_id: UUID,
+    sources: list[StorySources],
+    config: Config,
+    preset: Preset,
+    required_density: list[Density],
+) -> tuple[dict, list[Summary]]:
+    """Summarize a story in every required density and a title.
+
+    Returns the response body and `Summary` rows, which are left for the
+    caller to save.
+    """
+    required_density = required_density[::-1] + [Density.TITLE]
+    summary_id = uuid4()
+    story = list(map(lambda x: x.text, sources))
+
+    response: dict[Any, Any] = {}
+    summaries = await asyncio.gather(
+        *[
+            generate_summary(corr_id, story, config, density, preset)
+            for density in required_density
+        ]
+    )
+    response["summary"] = dict(zip(required_density, summaries, strict=True))
+
+    response["summary_id"] = summary_id
+
+    entities = []
+
+    for density in required_density:
+        summary_entity = Summary(
+            summary_id=summary_id,
+            chat_id=chat_id,
+            story_id=story_id,
+            summary=response["summary"][density]["edited"],
+            title=response["summary"][Density.TITLE]["edited"],
+            density=density,
+            config_id=config.config_id,
+            feedback=None,
+            date_created=datetime.now().strftime(DB_DATE_FORMAT),
+        )
+        entities.append(summary_entity)
+
+    response["references"] = list(map(lambda x: x.reference, sources))
+    return response, entities
+
+
+async def load_stories(
+    story_ids: list[UUID],
+) -> dict[UUID, list[StorySources]]:
+    """Load sources of stories, leaving out stories without sources."""
+    stories: dict[UUID, list[StorySources]] = await select_by_ids(
+        STORY_SOURCES_VIEW, StorySources, "story_id", story_ids
+    )
+    return {
+        story_id: sources for story_id, sources in stories.items() if sources
+    }
+
+
+class SummaryBatch:
+    """Summaries of a batch summarize request.
+
+    `Summary` rows of every story are collected while stories complete and
+    written by `save_summaries` in one insert.
+    """
+
+    def __init__(
+        self,
+        story_ids: list[UUID],
+        stories: dict[UUID, list[StorySources]],
+    ):
+        self.summaries: dict[UUID, dict] = {}
+        self.entities: list[Summary] = []
+        self.skipped_story_ids = [
+            story_id for story_id in story_ids if story_id not in stories
+        ]
+        self.failed_story_ids: list[UUID] = []
+
+    def add(
+        self, story_id: UUID, response: dict, entities: list[Summary]
+    ) -> None:
+        self.summaries[story_id] = response
+        self.entities.extend(entities)
+
+    def dump(self) -> dict:
+        return {
+            "skipped_story_ids": self.skipped_story_ids,
+            "failed_story_ids": self.failed_story_ids,
+        }
+
+
+async def summarize_stories(
+    corr_id: UUID,
+    chat_id: int,
+    stories: dict[UUID, list[StorySources]],
+    config: Config,
+    preset: Preset,
+    required_density: list[Density],
+    batch: SummaryBatch,
+) -> AsyncIterator[tuple[UUID, dict]]:
+    """Summarize stories concurrently, yielding results as they complete.
+
+    At most `summarizer.batch_concurrency` stories are summarized at once.
+    Stories the summarizer failed on are recorded in the batch as failed,
+    stories which ran out of deadline or were shed by admission control as
+    skipped.
+    """
+    semaphore = asyncio.Semaphore(
+        supervisor_settings.summarizer.batch_concurrency
+    )
+
+    async def summarize(story_id: UUID, sources: list[StorySources]):
+        async with semaphore:
+            try:
+                response, entities = await summarize_story(
+                    corr_id,
+                    chat_id,
+                    story_id,
+                    sources,
+                    config,
+                    preset,
+                    required_density,
+                )
+            except ComponentException as e:
+                logger.error(
+                    f"Failed to summarize story {story_id}: "
+                    f"{e.component} returned {e.component_error}"
+                )
+                batch.failed_story_ids.append(story_id)
+                return None
+            except (DeadlineExceeded, OverloadException) as e:
+                logger.warning(f"Skipped story {story_id}: {type(e).__name__}")
+                batch.skipped_story_ids.append(story_id)
+                return None
+        batch.add(story_id, response, entities)
+        return story_id, response
+
+    tasks = [
+        asyncio.ensure_future(summarize(story_id, sources))
+        for story_id, sources in stories.items()
+    ]
+    try:
+        for task in asyncio.as_completed(tasks):
+            result = await task
+            if result is not None:
+                yield result
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def save_summaries(entities: list[Summary]) -> None:
+    if not entities:
+        return
+    with track_stage("db_persist", size=len(entities)):
+        await ctx.summary_repo.add(entities)
+
+
+async def stream_summaries(
+    corr_id: UUID,
+    request: BatchSummarizeRequest,
+    stories: dict[UUID, list[StorySources]],
+    config: Config,
+    preset: Preset,
+):
+    """Yield NDJSON lines with summaries of stories as they complete.
+
+    Summaries are saved in one insert before the last line, which carries
+    IDs of skipped and failed stories.
+    """
+    batch = SummaryBatch(request.story_ids, stories)
+    async for story_id, response in summarize_stories(
+        corr_id,
+        request.chat_id,
+        stories,
+        config,
+        preset,
+        request.required_density,
+        batch,
+    ):
+        yield dump_line({"story_id": story_id, **response})
+
+    await save_summaries(batch.entities)
+    await ctx.timelines.save()
+    yield dump_line({"done": True, **batch.dump()})
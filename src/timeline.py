@@ -0,0 +1,150 @@
+import json
+import logging
+import time
+from contextvars import ContextVar
+from uuid import UUID
+
+from redis.asyncio import Redis
+
+from config import TimelineSettings
+
+logger = logging.getLogger("supervisor")
+
+
+class Span:
+    """A single stage or downstream call of a request."""
+
+    __slots__ = ("stage", "start", "end", "size")
+
+    def __init__(self, stage: str, size: int | None = None):
+        self.stage = stage
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.size = size
+
+    def finish(self) -> None:
+        self.end = time.perf_counter()
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+
+class Timeline:
+    """Spans recorded while handling a request.
+
+    Tasks spawned by the request share the same timeline through the
+    context variable, so spans of concurrent stages end up in one place.
+    """
+
+    def __init__(self, request_id: UUID):
+        self.request_id = request_id
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.spans: list[Span] = []
+
+    def add(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def _offset_ms(self, moment: float) -> int:
+        return round((moment - self.origin) * 1000)
+
+    def dump(self) -> str:
+        # NOTE: Spans are stored as [stage, start_ms, end_ms, size] rows
+        # with offsets from the request start to keep the payload small
+        return json.dumps(
+            {
+                "started_at": round(self.started_at, 3),
+                "spans": [
+                    [
+                        span.stage,
+                        self._offset_ms(span.start),
+                        self._offset_ms(span.end or span.start),
+                        span.size,
+                    ]
+                    for span in self.spans
+                ],
+            },
+            separators=(",", ":"),
+        )
+
+
+class TimelineGroup:
+    """Timelines of the requests sharing a coalesced call.
+
+    Spans recorded by the shared call are added to the timeline of every
+    request that awaits it.
+    """
+
+    def __init__(self):
+        self.timelines: list[Timeline] = []
+
+    def join(self, timeline: Timeline | None) -> None:
+        if timeline is not None:
+            self.timelines.append(timeline)
+
+    def add(self, span: Span) -> None:
+        for timeline in self.timelines:
+            timeline.add(span)
+
+
+_timeline: ContextVar[Timeline | TimelineGroup | None] = ContextVar(
+    "timeline", default=None
+)
+
+
+def start_timeline(request_id: UUID) -> Timeline:
+    timeline = Timeline(request_id)
+    _timeline.set(timeline)
+    return timeline
+
+
+def current_timeline() -> Timeline | TimelineGroup | None:
+    return _timeline.get()
+
+
+def share_timeline(group: TimelineGroup) -> None:
+    """Record spans of the current context to every timeline of `group`."""
+    _timeline.set(group)
+
+
+class TimelineStore:
+    """Keeps request timelines in Redis for a limited time."""
+
+    KEY_PREFIX = "timeline:"
+
+    def __init__(self, redis: Redis, settings: TimelineSettings):
+        self.redis = redis
+        self.settings = settings
+
+    async def save(self) -> None:
+        timeline = current_timeline()
+        if not self.settings.enabled or not isinstance(timeline, Timeline):
+            return
+        try:
+            await self.redis.set(
+                self.KEY_PREFIX + str(timeline.request_id),
+                timeline.dump(),
+                ex=self.settings.ttl,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to save request timeline: {e}")
+
+    async def get(self, request_id: UUID) -> dict | None:
+        raw = await self.redis.get(self.KEY_PREFIX + str(request_id))
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        return {
+            "request_id": request_id,
+            "started_at": data["started_at"],
+            "spans": [
+                {
+                    "stage": stage,
+                    "start_ms": start_ms,
+                    "end_ms": end_ms,
+                    "size": size,
+                }
+                for stage, start_ms, end_ms, size in data["spans"]
+            ],
+        }
@@ -2,8 +2,9 @@ from asyncio import Queue
 from uuid import UUID, uuid4
 
 from clustering import clusterize
+from metrics import track_stage
 
-from db import save_category_to_db, save_stories_to_db
+from db import FetchBatch
 from shared.entities import (
     Config,
     Source,
@@ -24,34 +25,46 @@ async def process_categories(
         category_id, category = categories.pop()
         if not category:
             continue
-        stories = await clusterize(
-            corr_id,
-            config.embedding_source,
-            config.linking_method,
-            category,
-        )
+        with track_stage("link_category", size=len(category)):
+            stories = await clusterize(
+                corr_id,
+                config.embedding_source,
+                config.linking_method,
+                category,
+            )
         await queue.put((corr_id, category_id, stories))
 
 
+def finalize_category(
+    category_id: UUID,
+    stories: list[tuple[UUID, list[Source]]],
+    batch: FetchBatch,
+) -> CategoryEntry:
+    batch.add_category(category_id, stories)
+
+    story_entries: list[StoryEntry] = []
+    for story in stories[:-1]:
+        story_id = story[0]
+        batch.add_story(story_id, story[1])
+        story_entries.append(StoryEntry(uuid=story_id, noise=False))
+    for noise_story in stories[-1][1]:
+        uuid = uuid4()
+        batch.add_story(uuid, [noise_story])
+        story_entries.append(StoryEntry(uuid=uuid, noise=True))
+    return CategoryEntry(
+        uuid=category_id,
+        stories=story_entries,
+    )
+
+
 async def finalize_category_entries(
     queue: Queue,
     category_entries,
     index_map: dict[UUID, int],
+    batch: FetchBatch,
 ):
     for _ in range(len(index_map)):
-        corr_id, category_id, stories = await queue.get()
-        await save_category_to_db(corr_id, category_id, stories)
-
-        story_entries: list[StoryEntry] = []
-        for story in stories[:-1]:
-            story_id = story[0]
-            await save_stories_to_db(story_id, story[1])
-            story_entries.append(StoryEntry(uuid=story_id, noise=False))
-        for noise_story in stories[-1][1]:
-            uuid = uuid4()
-            await save_stories_to_db(uuid, [noise_story])
-            story_entries.append(StoryEntry(uuid=uuid, noise=True))
-        category_entries[index_map[category_id]] = CategoryEntry(
-            uuid=category_id,
-            stories=story_entries,
+        _, category_id, stories = await queue.get()
+        category_entries[index_map[category_id]] = finalize_category(
+            category_id, stories, batch
         )